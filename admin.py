@@ -1,73 +1,148 @@
-from flask import Blueprint, jsonify, request
-from datetime import datetime
+from flask import Blueprint, Response, request
 from src.routes.auth import token_required
 from src.config.ai_config import ai_config_manager, SubjectMatter, AIProvider, AIModelConfig, SubjectMatterConfig
-from src.services.ai_service import ai_service
+from src.services.ai_service import ai_service, run_async
+from src.utils import json_dumps, json_response, now_iso
 import asyncio
+import operator
+import time
 
 admin_bp = Blueprint('admin', __name__)
 
-def run_async(coro):
-    """Helper to run async functions in Flask routes"""
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+# Enum members never change at runtime, so their values are built once
+_PROVIDER_VALUES = tuple(provider.value for provider in AIProvider)
+_SUBJECT_MEMBERS = tuple(SubjectMatter)
+_SUBJECT_VALUES = tuple(subject.value for subject in _SUBJECT_MEMBERS)
+_INVALID_SUBJECT_MESSAGE = f'Subject must be one of: {list(_SUBJECT_VALUES)}'
+_SUBJECT_BY_VALUE = {subject.value: subject for subject in _SUBJECT_MEMBERS}
+_PROVIDER_BY_VALUE = {provider.value: provider for provider in AIProvider}
+_HEALTHY_STATUSES = frozenset(('connected', 'always_available'))
+_UPDATE_FIELDS = frozenset(('system_prompt', 'context_template', 'cache_responses', 'cache_duration_hours'))
+
+async def gather_results(*aws):
+    """Await several coroutines concurrently, returning exceptions in place of results"""
+    return await asyncio.gather(*aws, return_exceptions=True)
+
+# Connectivity probe results are shared across requests for a short window
+CONNECTIVITY_TTL = 30
+_connectivity_cache = {'ts': 0.0, 'data': None}
+_connectivity_lock = asyncio.Lock()
+
+async def cached_connectivity():
+    """Test provider connectivity, reusing a recent result and coalescing concurrent probes"""
+    async with _connectivity_lock:
+        data = _connectivity_cache['data']
+        if data is not None and time.monotonic() - _connectivity_cache['ts'] < CONNECTIVITY_TTL:
+            return data
+        
+        data = await ai_service.test_connectivity()
+        _connectivity_cache['ts'] = time.monotonic()
+        _connectivity_cache['data'] = data
+        return data
+
+async def fetch_system_status():
+    """Collect service status and provider connectivity concurrently"""
+    return await asyncio.gather(
+        asyncio.to_thread(ai_service.get_service_status),
+        cached_connectivity()
+    )
+
+def system_health(connectivity_results):
+    """Summarize provider connectivity as 'operational' or 'degraded'"""
+    return 'degraded' if any(
+        result.get('status') not in _HEALTHY_STATUSES
+        for result in connectivity_results.values()
+    ) else 'operational'
+
+def invalidate_connectivity_cache():
+    """Force the next connectivity check to probe the providers"""
+    _connectivity_cache['data'] = None
+
+# Serialized subject configurations, reused until ai_config_manager.version changes
+_config_cache = {'version': -1, 'payload': None}
+
+def serialize_subject_configs():
+    """Build the subject configuration payload, cached per configuration version"""
+    version = ai_config_manager.version
+    if _config_cache['version'] == version:
+        return _config_cache['payload']
     
-    return loop.run_until_complete(coro)
+    configs = {}
+    for subject in _SUBJECT_MEMBERS:
+        config = ai_config_manager.get_subject_config(subject)
+        if config:
+            configs[subject.value] = {
+                'subject': subject.value,
+                'primary_model': {
+                    'provider': config.primary_model.provider.value,
+                    'model_name': config.primary_model.model_name,
+                    'max_tokens': config.primary_model.max_tokens,
+                    'temperature': config.primary_model.temperature,
+                    'timeout': config.primary_model.timeout
+                },
+                'fallback_model': {
+                    'provider': config.fallback_model.provider.value if config.fallback_model else None,
+                    'model_name': config.fallback_model.model_name if config.fallback_model else None
+                } if config.fallback_model else None,
+                'system_prompt': config.system_prompt,
+                'context_template': config.context_template,
+                'cache_responses': config.cache_responses,
+                'cache_duration_hours': config.cache_duration_hours
+            }
+    
+    _config_cache['payload'] = configs
+    _config_cache['version'] = version
+    return configs
+
+# Configuration payload and its encoding; service_status may be up to CONFIG_BODY_TTL seconds old
+CONFIG_BODY_TTL = 5
+_config_cache = {'version': -1, 'ts': 0.0, 'data': None, 'body': None}
+
+def config_response_data():
+    """Build the configuration payload, reused while the config version is unchanged"""
+    version = ai_config_manager.version
+    now = time.monotonic()
+    if _config_cache['version'] == version and now - _config_cache['ts'] < CONFIG_BODY_TTL:
+        return _config_cache['data']
+    
+    data = {
+        'subject_configurations': serialize_subject_configs(),
+        'service_status': ai_service.get_service_status(),
+        'available_providers': _PROVIDER_VALUES,
+        'available_subjects': _SUBJECT_VALUES
+    }
+    _config_cache.update(version=version, ts=now, data=data, body=None)
+    return data
+
+def config_response_body():
+    """Encode the configuration response once per cached payload"""
+    data = config_response_data()
+    body = _config_cache['body']
+    if body is None or _config_cache['data'] is not data:
+        body = json_dumps({
+            'success': True,
+            'message': 'AI configuration retrieved',
+            'data': data,
+            'errors': []
+        })
+        if _config_cache['data'] is data:
+            _config_cache['body'] = body
+    return body
 
 @admin_bp.route('/admin/ai/config', methods=['GET'])
 @token_required
 def get_ai_configuration(current_user):
     """Get complete AI configuration"""
     try:
-        # Get all subject configurations
-        configs = {}
-        for subject in SubjectMatter:
-            config = ai_config_manager.get_subject_config(subject)
-            if config:
-                configs[subject.value] = {
-                    'subject': subject.value,
-                    'primary_model': {
-                        'provider': config.primary_model.provider.value,
-                        'model_name': config.primary_model.model_name,
-                        'max_tokens': config.primary_model.max_tokens,
-                        'temperature': config.primary_model.temperature,
-                        'timeout': config.primary_model.timeout
-                    },
-                    'fallback_model': {
-                        'provider': config.fallback_model.provider.value if config.fallback_model else None,
-                        'model_name': config.fallback_model.model_name if config.fallback_model else None
-                    } if config.fallback_model else None,
-                    'system_prompt': config.system_prompt,
-                    'context_template': config.context_template,
-                    'cache_responses': config.cache_responses,
-                    'cache_duration_hours': config.cache_duration_hours
-                }
-        
-        # Get service status
-        service_status = ai_service.get_service_status()
-        
-        return jsonify({
-            'success': True,
-            'message': 'AI configuration retrieved',
-            'data': {
-                'subject_configurations': configs,
-                'service_status': service_status,
-                'available_providers': [provider.value for provider in AIProvider],
-                'available_subjects': [subject.value for subject in SubjectMatter]
-            },
-            'errors': []
-        }), 200
+        return Response(config_response_body(), status=200, mimetype='application/json')
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to get AI configuration',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @admin_bp.route('/admin/ai/config/<subject>', methods=['PUT'])
 @token_required
@@ -75,80 +150,75 @@ def update_subject_configuration(current_user, subject):
     """Update configuration for a specific subject matter"""
     try:
         # Validate subject
-        try:
-            subject_enum = SubjectMatter(subject)
-        except ValueError:
-            return jsonify({
+        subject_enum = _SUBJECT_BY_VALUE.get(subject)
+        if subject_enum is None:
+            return json_response({
                 'success': False,
                 'message': 'Invalid subject matter',
                 'data': None,
-                'errors': [{'field': 'subject', 'message': f'Subject must be one of: {[s.value for s in SubjectMatter]}'}]
-            }), 422
+                'errors': [{'field': 'subject', 'message': _INVALID_SUBJECT_MESSAGE}]
+            }, 422)
         
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         
         # Get current configuration
         current_config = ai_config_manager.get_subject_config(subject_enum)
         if not current_config:
-            return jsonify({
+            return json_response({
                 'success': False,
                 'message': 'Subject configuration not found',
                 'data': None,
                 'errors': []
-            }), 404
+            }, 404)
         
         # Update primary model if provided
         if 'primary_model' in data:
             model_data = data['primary_model']
-            try:
-                provider = AIProvider(model_data.get('provider', current_config.primary_model.provider.value))
-                current_config.primary_model = AIModelConfig(
-                    provider=provider,
-                    model_name=model_data.get('model_name', current_config.primary_model.model_name),
-                    api_key=model_data.get('api_key', current_config.primary_model.api_key),
-                    api_base=model_data.get('api_base', current_config.primary_model.api_base),
-                    max_tokens=model_data.get('max_tokens', current_config.primary_model.max_tokens),
-                    temperature=model_data.get('temperature', current_config.primary_model.temperature),
-                    timeout=model_data.get('timeout', current_config.primary_model.timeout)
-                )
-            except ValueError as e:
-                return jsonify({
+            provider_value = model_data.get('provider', current_config.primary_model.provider.value)
+            provider = _PROVIDER_BY_VALUE.get(provider_value)
+            if provider is None:
+                return json_response({
                     'success': False,
                     'message': 'Invalid provider',
                     'data': None,
-                    'errors': [{'field': 'provider', 'message': str(e)}]
-                }), 422
+                    'errors': [{'field': 'provider', 'message': f'{provider_value!r} is not a valid AIProvider'}]
+                }, 422)
+            
+            current_config.primary_model = AIModelConfig(
+                provider=provider,
+                model_name=model_data.get('model_name', current_config.primary_model.model_name),
+                api_key=model_data.get('api_key', current_config.primary_model.api_key),
+                api_base=model_data.get('api_base', current_config.primary_model.api_base),
+                max_tokens=model_data.get('max_tokens', current_config.primary_model.max_tokens),
+                temperature=model_data.get('temperature', current_config.primary_model.temperature),
+                timeout=model_data.get('timeout', current_config.primary_model.timeout)
+            )
         
         # Update other configuration fields
-        if 'system_prompt' in data:
-            current_config.system_prompt = data['system_prompt']
-        if 'context_template' in data:
-            current_config.context_template = data['context_template']
-        if 'cache_responses' in data:
-            current_config.cache_responses = data['cache_responses']
-        if 'cache_duration_hours' in data:
-            current_config.cache_duration_hours = data['cache_duration_hours']
+        for field in _UPDATE_FIELDS & data.keys():
+            setattr(current_config, field, data[field])
         
         # Save updated configuration
         ai_config_manager.update_subject_config(subject_enum, current_config)
+        invalidate_connectivity_cache()
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': f'Configuration updated for {subject}',
             'data': {
                 'subject': subject,
-                'updated_at': datetime.utcnow().isoformat()
+                'updated_at': now_iso()
             },
             'errors': []
-        }), 200
+        }, 200)
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to update configuration',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @admin_bp.route('/admin/ai/test/<subject>', methods=['POST'])
 @token_required
@@ -156,15 +226,14 @@ def test_subject_ai(current_user, subject):
     """Test AI generation for a specific subject"""
     try:
         # Validate subject
-        try:
-            subject_enum = SubjectMatter(subject)
-        except ValueError:
-            return jsonify({
+        subject_enum = _SUBJECT_BY_VALUE.get(subject)
+        if subject_enum is None:
+            return json_response({
                 'success': False,
                 'message': 'Invalid subject matter',
                 'data': None,
-                'errors': [{'field': 'subject', 'message': f'Subject must be one of: {[s.value for s in SubjectMatter]}'}]
-            }), 422
+                'errors': [{'field': 'subject', 'message': _INVALID_SUBJECT_MESSAGE}]
+            }, 422)
         
         data = request.get_json() or {}
         test_context = data.get('context', {})
@@ -173,50 +242,50 @@ def test_subject_ai(current_user, subject):
         # Generate test response
         ai_response = run_async(ai_service.generate_response(subject_enum, test_context, force_ai))
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': f'AI test completed for {subject}',
             'data': {
                 'subject': subject,
                 'test_context': test_context,
                 'ai_response': ai_response.to_dict(),
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': now_iso()
             },
             'errors': []
-        }), 200
+        }, 200)
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'AI test failed',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @admin_bp.route('/admin/ai/connectivity', methods=['GET'])
 @token_required
 def check_ai_connectivity(current_user):
     """Check connectivity to all AI providers"""
     try:
-        connectivity_results = run_async(ai_service.test_connectivity())
+        connectivity_results = run_async(cached_connectivity())
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'Connectivity check completed',
             'data': {
                 'connectivity_results': connectivity_results,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': now_iso()
             },
             'errors': []
-        }), 200
+        }, 200)
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Connectivity check failed',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @admin_bp.route('/admin/ai/sync', methods=['POST'])
 @token_required
@@ -228,37 +297,45 @@ def sync_ai_fallbacks(current_user):
         subjects = data.get('subjects', [])
         
         if subjects:
-            # Sync specific subjects
+            # Sync specific subjects concurrently
             sync_results = {}
+            pending = {}
             for subject_name in subjects:
-                try:
-                    subject_enum = SubjectMatter(subject_name)
-                    # This would need to be implemented in ai_service
-                    sync_results[subject_name] = "synced"
-                except ValueError:
+                subject_enum = _SUBJECT_BY_VALUE.get(subject_name)
+                if subject_enum is None:
                     sync_results[subject_name] = "invalid_subject"
+                else:
+                    pending[subject_name] = subject_enum
+                    sync_results[subject_name] = None
+            
+            results = run_async(gather_results(*(
+                ai_service.sync_subject(subject_enum, force=force_sync)
+                for subject_enum in pending.values()
+            )), timeout=None)
+            for subject_name, result in zip(pending, results):
+                sync_results[subject_name] = f"error: {result}" if isinstance(result, BaseException) else result
         else:
             # Sync all subjects
-            sync_results = run_async(ai_service.sync_with_ai(force=force_sync))
+            sync_results = run_async(ai_service.sync_with_ai(force=force_sync), timeout=None)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'AI sync completed',
             'data': {
                 'sync_results': sync_results,
                 'force_sync': force_sync,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': now_iso()
             },
             'errors': []
-        }), 200
+        }, 200)
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'AI sync failed',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @admin_bp.route('/admin/ai/cache', methods=['DELETE'])
 @token_required
@@ -266,23 +343,35 @@ def clear_ai_cache(current_user):
     """Clear AI response cache"""
     try:
         ai_config_manager.clear_cache()
+        invalidate_connectivity_cache()
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'AI cache cleared successfully',
             'data': {
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': now_iso()
             },
             'errors': []
-        }), 200
+        }, 200)
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to clear cache',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
+
+_FALLBACK_FIELDS = ('context_type', 'mood', 'response_text', 'animation_type', 'weight', 'created_at')
+_get_fallback_fields = operator.attrgetter(*_FALLBACK_FIELDS)
+
+def serialize_fallback(r):
+    """Serialize a single fallback response"""
+    values = _get_fallback_fields(r)
+    serialized = dict(zip(_FALLBACK_FIELDS, values))
+    created_at = values[-1]
+    serialized['created_at'] = created_at.isoformat() if created_at else None
+    return serialized
 
 @admin_bp.route('/admin/ai/fallbacks', methods=['GET'])
 @token_required
@@ -290,65 +379,148 @@ def get_fallback_responses(current_user):
     """Get all fallback responses"""
     try:
         fallbacks = {}
+        total_responses = 0
         for subject, responses in ai_config_manager.fallback_responses.items():
-            fallbacks[subject.value] = [
-                {
-                    'context_type': r.context_type,
-                    'mood': r.mood,
-                    'response_text': r.response_text,
-                    'animation_type': r.animation_type,
-                    'weight': r.weight,
-                    'created_at': r.created_at.isoformat() if r.created_at else None
-                }
-                for r in responses
-            ]
+            rows = [serialize_fallback(r) for r in responses]
+            fallbacks[subject.value] = rows
+            total_responses += len(rows)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'Fallback responses retrieved',
             'data': {
                 'fallback_responses': fallbacks,
-                'total_responses': sum(len(responses) for responses in ai_config_manager.fallback_responses.values())
+                'total_responses': total_responses
             },
             'errors': []
-        }), 200
+        })
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to get fallback responses',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @admin_bp.route('/admin/ai/status', methods=['GET'])
 @token_required
 def get_ai_system_status(current_user):
     """Get comprehensive AI system status"""
     try:
-        service_status = ai_service.get_service_status()
-        connectivity_results = run_async(ai_service.test_connectivity())
+        service_status, connectivity_results = run_async(fetch_system_status())
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'AI system status retrieved',
             'data': {
                 'service_status': service_status,
                 'connectivity_results': connectivity_results,
-                'system_health': 'operational' if all(
-                    result.get('status') in ['connected', 'always_available'] 
-                    for result in connectivity_results.values()
-                ) else 'degraded',
-                'timestamp': datetime.utcnow().isoformat()
+                'system_health': system_health(connectivity_results),
+                'timestamp': now_iso()
             },
             'errors': []
-        }), 200
+        }, 200)
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to get system status',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
+
+async def _batch_config():
+    return await asyncio.to_thread(config_response_data)
+
+async def _batch_status():
+    service_status, connectivity_results = await fetch_system_status()
+    return {
+        'service_status': service_status,
+        'connectivity_results': connectivity_results,
+        'system_health': system_health(connectivity_results)
+    }
+
+async def _batch_connectivity():
+    return {'connectivity_results': await cached_connectivity()}
+
+async def _batch_fallbacks():
+    fallbacks = {
+        subject.value: [serialize_fallback(r) for r in responses]
+        for subject, responses in list(ai_config_manager.fallback_responses.items())
+    }
+    return {
+        'fallback_responses': fallbacks,
+        'total_responses': sum(len(responses) for responses in fallbacks.values())
+    }
 
+# Upper bound on the operations in one batch request
+MAX_BATCH_OPERATIONS = 16
+
+# Read-only operations that can be combined in a single batch request
+_BATCH_OPERATIONS = {
+    'config': _batch_config,
+    'status': _batch_status,
+    'connectivity': _batch_connectivity,
+    'fallbacks': _batch_fallbacks
+}
+
+def batch_error(field, message):
+    """Reject a malformed batch request"""
+    return json_response({
+        'success': False,
+        'message': 'Invalid batch request',
+        'data': None,
+        'errors': [{'field': field, 'message': message}]
+    }, 422)
+
+@admin_bp.route('/admin/ai/batch', methods=['POST'])
+@token_required
+def batch_admin_requests(current_user):
+    """Run several read-only admin operations concurrently in one request"""
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('requests', []) if isinstance(data, dict) else None
+        if not isinstance(items, list) or not all(
+                isinstance(item, dict) and isinstance(item.get('op'), str) for item in items):
+            return batch_error('requests', 'Requests must be a list of objects with a string op')
+        if len(items) > MAX_BATCH_OPERATIONS:
+            return batch_error('requests', f'At most {MAX_BATCH_OPERATIONS} operations per batch')
+        
+        operations = [item['op'] for item in items]
+        invalid = [op for op in operations if op not in _BATCH_OPERATIONS]
+        if invalid:
+            return batch_error('op', f'Operation must be one of: {list(_BATCH_OPERATIONS)}')
+        
+        # Repeated operations run once and share their result
+        unique_operations = tuple(dict.fromkeys(operations))
+        results = dict(zip(
+            unique_operations,
+            run_async(gather_results(*(_BATCH_OPERATIONS[op]() for op in unique_operations)))
+        ))
+        
+        responses = []
+        for op in operations:
+            result = results[op]
+            if isinstance(result, BaseException):
+                responses.append({'op': op, 'success': False, 'data': None, 'errors': [{'message': str(result)}]})
+            else:
+                responses.append({'op': op, 'success': True, 'data': result, 'errors': []})
+        
+        return json_response({
+            'success': True,
+            'message': 'Batch completed',
+            'data': {
+                'responses': responses,
+                'timestamp': now_iso()
+            },
+            'errors': []
+        }, 200)
+        
+    except Exception as e:
+        return json_response({
+            'success': False,
+            'message': 'Batch request failed',
+            'data': None,
+            'errors': [{'message': str(e)}]
+        }, 500)
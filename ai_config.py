@@ -5,23 +5,127 @@ Handles AI model selection, prompting, and fallback mechanisms
 
 import os
 import json
+import bisect
+import functools
+import hashlib
+import heapq
+import itertools
+import keyword
+import random
+import string
 import time
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple, Callable, Mapping
+from dataclasses import dataclass, field
 from enum import Enum
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds before a provider's connectivity is checked again
+CONNECTIVITY_RETRY_SECONDS = 300
+
+# Config files at least this large are stream-parsed when ijson is installed
+STREAM_PARSE_MIN_BYTES = 1 << 20
+
+def _json_default(obj):
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _json_loads(data):
+    """Parse JSON text, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _json_dumps(obj, pretty: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON, using orjson when it is installed
+
+    Output is compact unless pretty is set, which indents by two spaces.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=_json_default).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=_json_default).encode('utf-8')
+
+def _canonical_json(obj) -> bytes:
+    """Serialize obj compactly with sorted keys, for hashing"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+_FORMATTER = string.Formatter()
+
+# Bound once for the fallback selection hot path
+_bisect_right = bisect.bisect_right
+_random = random.random
+
+@functools.lru_cache(maxsize=256)
+def compile_context_template(template: str) -> Callable[[Mapping], str]:
+    """Compile a str.format template into a function of the context mapping
+
+    Templates whose fields are all plain names become a generated f-string
+    function; anything else (attribute/index fields, format specs,
+    conversions) falls back to template.format_map. Either way a missing key
+    raises KeyError, as str.format does.
+    """
+    try:
+        parsed = list(_FORMATTER.parse(template))
+    except ValueError:
+        return template.format_map
+    
+    parts = []
+    names = []
+    for literal, name, spec, conversion in parsed:
+        parts.append(literal.replace('{', '{{').replace('}', '}}'))
+        if name is None:
+            continue
+        if (spec or conversion or not name.isidentifier()
+                or name.startswith('_') or keyword.iskeyword(name)):
+            return template.format_map
+        if name not in names:
+            names.append(name)
+        parts.append('{' + name + '}')
+    
+    lines = ['def _format(_ctx):']
+    lines.extend(f'    {name} = _ctx[{name!r}]' for name in names)
+    lines.append(f"    return f{''.join(parts)!r}")
+    namespace = {'__builtins__': {}}
+    exec('\n'.join(lines), namespace)
+    return namespace['_format']
+
 class AIProvider(Enum):
     """Supported AI providers"""
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
     LOCAL = "local"
     FALLBACK = "fallback"
+    
+    def __new__(cls, value):
+        member = object.__new__(cls)
+        member._value_ = value
+        # Position in definition order, used to index per-provider lists
+        member.ordinal = len(cls.__members__)
+        return member
 
 class SubjectMatter(Enum):
     """Different subject matters for AI interactions"""
@@ -38,7 +142,15 @@ class SubjectMatter(Enum):
     TEAM_COLLABORATION = "team_collaboration"
     PROJECT_PLANNING = "project_planning"
 
-@dataclass
+# Enum value strings, looked up once for status reports
+_PROVIDER_VALUE = {provider: provider.value for provider in AIProvider}
+_SUBJECT_VALUE = {subject: subject.value for subject in SubjectMatter}
+
+# Reverse lookups for validating names read from the config file
+_PROVIDER_BY_VALUE = {value: provider for provider, value in _PROVIDER_VALUE.items()}
+_SUBJECT_BY_VALUE = {value: subject for subject, value in _SUBJECT_VALUE.items()}
+
+@dataclass(slots=True)
 class AIModelConfig:
     """Configuration for a specific AI model"""
     provider: AIProvider
@@ -50,8 +162,11 @@ class AIModelConfig:
     timeout: int = 10
     retry_attempts: int = 3
     retry_delay: float = 1.0
+    # HTTP connection pool limits, sized to the provider's rate limit tier
+    max_connections: int = 512
+    max_keepalive_connections: int = 256
 
-@dataclass
+@dataclass(slots=True)
 class SubjectMatterConfig:
     """Configuration for subject matter specific AI interactions"""
     subject: SubjectMatter
@@ -63,8 +178,13 @@ class SubjectMatterConfig:
     max_context_length: int = 1000
     cache_responses: bool = True
     cache_duration_hours: int = 24
+    
+    @property
+    def compiled_context(self) -> Callable[[Mapping], str]:
+        """context_template compiled into a formatter taking the context dict"""
+        return compile_context_template(self.context_template)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FallbackResponse:
     """Predefined fallback response"""
     subject: SubjectMatter
@@ -73,11 +193,7 @@ class FallbackResponse:
     response_text: str
     animation_type: str
     weight: int = 1  # For weighted random selection
-    created_at: datetime = None
-    
-    def __post_init__(self):
-        if self.created_at is None:
-            self.created_at = datetime.utcnow()
+    created_at: datetime = field(default_factory=datetime.utcnow)
 
 class AIConfigurationManager:
     """Manages AI configurations and fallback mechanisms"""
@@ -87,28 +203,67 @@ class AIConfigurationManager:
             os.path.dirname(__file__), 'ai_config.json'
         )
         self.subject_configs: Dict[SubjectMatter, SubjectMatterConfig] = {}
-        self.fallback_responses: Dict[SubjectMatter, List[FallbackResponse]] = {}
-        self.connectivity_status: Dict[AIProvider, bool] = {}
+        # Raw subject entries from the config file, parsed on first request
+        self._raw_subject_configs: Dict[str, Dict] = {}
+        self._fallback_responses: Optional[Dict[SubjectMatter, Tuple[FallbackResponse, ...]]] = None
+        self._fallback_index: Dict[SubjectMatter, Dict] = {}
+        # Shared AIModelConfig instances keyed by their field values
+        self._model_intern: Dict[Tuple, AIModelConfig] = {}
+        self._config_dir_ensured = False
+        # Per-provider state indexed by AIProvider.ordinal
+        self._conn_status: List[bool] = [False] * len(AIProvider)
+        # Monotonic time before which the last check result is reused
+        self._next_retry: List[float] = [0.0] * len(AIProvider)
+        # The static fallback provider is always available and never checked
+        self._conn_status[AIProvider.FALLBACK.ordinal] = True
+        self._next_retry[AIProvider.FALLBACK.ordinal] = float('inf')
+        self._probe_locks = [threading.Lock() for _ in AIProvider]
         self.last_sync_attempt: Dict[AIProvider, datetime] = {}
-        self.response_cache: Dict[str, Any] = {}
+        self._last_sync_iso: Dict[AIProvider, str] = {}
+        # LRU of cache_key -> (response, monotonic expiry), plus an expiry heap
+        self.response_cache: 'OrderedDict[bytes, Tuple[Any, float]]' = OrderedDict()
+        self._cache_heap: List[Tuple[float, bytes]] = []
+        self._cache_max = 10_000
+        # Bumped on every mutation so callers can cache derived views
+        self.version = 0
+        # Primary model configs grouped by provider, rebuilt when version changes
+        self._provider_index: Dict[AIProvider, Tuple[AIModelConfig, ...]] = {}
+        self._provider_index_version = -1
+        self.refresh_env()
         
         self._load_configuration()
-        self._load_fallback_responses()
         self._initialize_connectivity_status()
     
+    def refresh_env(self):
+        """Re-read the provider environment variables"""
+        self._env = {
+            'OPENAI_API_KEY': os.getenv('OPENAI_API_KEY'),
+            'OPENAI_API_BASE': os.getenv('OPENAI_API_BASE'),
+        }
+    
     def _load_configuration(self):
         """Load AI configuration from file"""
         try:
             if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    config_data = json.load(f)
-                    self._parse_configuration(config_data)
+                if ijson is not None and os.path.getsize(self.config_file) >= STREAM_PARSE_MIN_BYTES:
+                    self._raw_subject_configs = self._stream_parse_configuration(self.config_file)
+                else:
+                    # Unbuffered: readall() sizes one read from fstat
+                    with open(self.config_file, 'rb', buffering=0) as f:
+                        config_data = _json_loads(f.read())
+                    self._raw_subject_configs = dict(config_data.get('subjects', {}))
             else:
                 self._create_default_configuration()
         except Exception as e:
             logger.error(f"Failed to load AI configuration: {e}")
             self._create_default_configuration()
     
+    @staticmethod
+    def _stream_parse_configuration(path: str) -> Dict[str, Dict]:
+        """Read the raw subject entries with ijson, without loading the whole file"""
+        with open(path, 'rb') as f:
+            return dict(ijson.kvitems(f, 'subjects', use_float=True))
+    
     def _create_default_configuration(self):
         """Create default AI configuration"""
         logger.info("Creating default AI configuration...")
@@ -117,8 +272,8 @@ class AIConfigurationManager:
         default_openai = AIModelConfig(
             provider=AIProvider.OPENAI,
             model_name="gpt-3.5-turbo",
-            api_key=os.getenv('OPENAI_API_KEY'),
-            api_base=os.getenv('OPENAI_API_BASE'),
+            api_key=self._env['OPENAI_API_KEY'],
+            api_base=self._env['OPENAI_API_BASE'],
             max_tokens=150,
             temperature=0.8,
             timeout=10
@@ -182,67 +337,129 @@ class AIConfigurationManager:
         
         self._save_configuration()
     
-    def _parse_configuration(self, config_data: Dict):
-        """Parse configuration data from JSON"""
-        for subject_name, config in config_data.get('subjects', {}).items():
-            try:
-                subject = SubjectMatter(subject_name)
-                
-                # Parse primary model
-                primary_model_data = config['primary_model']
-                primary_model = AIModelConfig(
-                    provider=AIProvider(primary_model_data['provider']),
-                    model_name=primary_model_data['model_name'],
-                    api_key=primary_model_data.get('api_key') or os.getenv('OPENAI_API_KEY'),
-                    api_base=primary_model_data.get('api_base') or os.getenv('OPENAI_API_BASE'),
-                    max_tokens=primary_model_data.get('max_tokens', 150),
-                    temperature=primary_model_data.get('temperature', 0.7),
-                    timeout=primary_model_data.get('timeout', 10)
-                )
-                
-                # Parse fallback model if exists
-                fallback_model = None
-                if 'fallback_model' in config:
-                    fallback_data = config['fallback_model']
-                    fallback_model = AIModelConfig(
-                        provider=AIProvider(fallback_data['provider']),
-                        model_name=fallback_data['model_name'],
-                        timeout=fallback_data.get('timeout', 1)
-                    )
-                
-                self.subject_configs[subject] = SubjectMatterConfig(
-                    subject=subject,
-                    primary_model=primary_model,
-                    fallback_model=fallback_model,
-                    system_prompt=config.get('system_prompt', ''),
-                    context_template=config.get('context_template', ''),
-                    response_format=config.get('response_format', 'text'),
-                    cache_responses=config.get('cache_responses', True)
-                )
-                
-            except (ValueError, KeyError) as e:
-                logger.error(f"Failed to parse config for {subject_name}: {e}")
+    def _intern_model(self, model: AIModelConfig) -> AIModelConfig:
+        """Return the shared instance with the same fields as model"""
+        key = (model.provider, model.model_name, model.api_key, model.api_base, model.max_tokens,
+               model.temperature, model.timeout, model.retry_attempts, model.retry_delay,
+               model.max_connections, model.max_keepalive_connections)
+        try:
+            return self._model_intern.setdefault(key, model)
+        except TypeError:
+            # Unhashable field value from a hand-edited config; don't share it
+            return model
+    
+    def _parse_subject_entry(self, subject: SubjectMatter, config: Dict) -> Optional[SubjectMatterConfig]:
+        """Parse a single subject configuration entry from JSON"""
+        try:
+            # Parse primary model
+            primary_model_data = config['primary_model']
+            provider = _PROVIDER_BY_VALUE.get(primary_model_data['provider'])
+            if provider is None:
+                logger.error(f"Failed to parse config for {subject.value}: unknown provider {primary_model_data['provider']!r}")
+                return None
+            primary_model = self._intern_model(AIModelConfig(
+                provider=provider,
+                model_name=primary_model_data['model_name'],
+                api_key=primary_model_data.get('api_key') or self._env['OPENAI_API_KEY'],
+                api_base=primary_model_data.get('api_base') or self._env['OPENAI_API_BASE'],
+                max_tokens=primary_model_data.get('max_tokens', 150),
+                temperature=primary_model_data.get('temperature', 0.7),
+                timeout=primary_model_data.get('timeout', 10),
+                max_connections=primary_model_data.get('max_connections', 512),
+                max_keepalive_connections=primary_model_data.get('max_keepalive_connections', 256)
+            ))
+            
+            # Parse fallback model if exists
+            fallback_model = None
+            fallback_data = config.get('fallback_model')
+            if fallback_data:
+                provider = _PROVIDER_BY_VALUE.get(fallback_data['provider'])
+                if provider is None:
+                    logger.error(f"Failed to parse config for {subject.value}: unknown provider {fallback_data['provider']!r}")
+                    return None
+                fallback_model = self._intern_model(AIModelConfig(
+                    provider=provider,
+                    model_name=fallback_data['model_name'],
+                    timeout=fallback_data.get('timeout', 1)
+                ))
+            
+            return SubjectMatterConfig(
+                subject=subject,
+                primary_model=primary_model,
+                fallback_model=fallback_model,
+                system_prompt=config.get('system_prompt', ''),
+                context_template=config.get('context_template', ''),
+                response_format=config.get('response_format', 'text'),
+                cache_responses=config.get('cache_responses', True)
+            )
+            
+        except KeyError as e:
+            logger.error(f"Failed to parse config for {subject.value}: missing {e}")
+            return None
+        except (TypeError, ValueError) as e:
+            logger.error(f"Failed to parse config for {subject.value}: {e}")
+            return None
+    
+    def _materialize_subject_configs(self):
+        """Parse every subject entry still pending from the config file"""
+        for subject_name in list(self._raw_subject_configs):
+            subject = _SUBJECT_BY_VALUE.get(subject_name)
+            if subject is None:
+                logger.error(f"Failed to parse config for {subject_name}: unknown subject")
+                self._raw_subject_configs.pop(subject_name, None)
+                continue
+            self.get_subject_config(subject)
     
-    def _save_configuration(self):
-        """Save current configuration to file"""
+    @staticmethod
+    def _model_to_dict(model: AIModelConfig) -> Dict:
+        """Serialize a model config for the config file"""
+        return {
+            'provider': model.provider.value,
+            'model_name': model.model_name,
+            'api_key': model.api_key,
+            'api_base': model.api_base,
+            'max_tokens': model.max_tokens,
+            'temperature': model.temperature,
+            'timeout': model.timeout,
+            'retry_attempts': model.retry_attempts,
+            'retry_delay': model.retry_delay,
+            'max_connections': model.max_connections,
+            'max_keepalive_connections': model.max_keepalive_connections
+        }
+    
+    def _save_configuration(self, pretty: bool = False):
+        """Save current configuration to file, indented if pretty is set"""
         try:
             config_data = {
                 'subjects': {}
             }
             
+            # Subjects usually share model instances, so serialize each once
+            model_dicts = {}
+            def model_dict(model):
+                if model is None:
+                    return None
+                data = model_dicts.get(id(model))
+                if data is None:
+                    data = model_dicts[id(model)] = self._model_to_dict(model)
+                return data
+            
+            self._materialize_subject_configs()
             for subject, config in self.subject_configs.items():
                 config_data['subjects'][subject.value] = {
-                    'primary_model': asdict(config.primary_model),
-                    'fallback_model': asdict(config.fallback_model) if config.fallback_model else None,
+                    'primary_model': model_dict(config.primary_model),
+                    'fallback_model': model_dict(config.fallback_model),
                     'system_prompt': config.system_prompt,
                     'context_template': config.context_template,
                     'response_format': config.response_format,
                     'cache_responses': config.cache_responses
                 }
             
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            with open(self.config_file, 'w') as f:
-                json.dump(config_data, f, indent=2)
+            if not self._config_dir_ensured:
+                os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
+                self._config_dir_ensured = True
+            with open(self.config_file, 'wb') as f:
+                f.write(_json_dumps(config_data, pretty))
                 
         except Exception as e:
             logger.error(f"Failed to save configuration: {e}")
@@ -250,7 +467,7 @@ class AIConfigurationManager:
     def _load_fallback_responses(self):
         """Load predefined fallback responses"""
         fallback_data = {
-            SubjectMatter.TASK_CREATION: [
+            SubjectMatter.TASK_CREATION: (
                 FallbackResponse(
                     subject=SubjectMatter.TASK_CREATION,
                     context_type="general",
@@ -275,8 +492,8 @@ class AIConfigurationManager:
                     animation_type="warm_glow",
                     weight=2
                 )
-            ],
-            SubjectMatter.TASK_COMPLETION: [
+            ),
+            SubjectMatter.TASK_COMPLETION: (
                 FallbackResponse(
                     subject=SubjectMatter.TASK_COMPLETION,
                     context_type="general",
@@ -301,8 +518,8 @@ class AIConfigurationManager:
                     animation_type="victory_dance",
                     weight=2
                 )
-            ],
-            SubjectMatter.MOTIVATION: [
+            ),
+            SubjectMatter.MOTIVATION: (
                 FallbackResponse(
                     subject=SubjectMatter.MOTIVATION,
                     context_type="low_energy",
@@ -319,8 +536,8 @@ class AIConfigurationManager:
                     animation_type="warm_glow",
                     weight=2
                 )
-            ],
-            SubjectMatter.ENCOURAGEMENT: [
+            ),
+            SubjectMatter.ENCOURAGEMENT: (
                 FallbackResponse(
                     subject=SubjectMatter.ENCOURAGEMENT,
                     context_type="setback",
@@ -337,50 +554,103 @@ class AIConfigurationManager:
                     animation_type="warm_glow",
                     weight=2
                 )
-            ]
+            )
         }
         
-        self.fallback_responses = fallback_data
+        self._fallback_responses = fallback_data
+    
+    @property
+    def fallback_responses(self) -> Dict[SubjectMatter, Tuple[FallbackResponse, ...]]:
+        """Predefined fallback responses, loaded on first use"""
+        if self._fallback_responses is None:
+            self._load_fallback_responses()
+        return self._fallback_responses
     
     def _initialize_connectivity_status(self):
         """Initialize connectivity status for all providers"""
         for provider in AIProvider:
             if provider != AIProvider.FALLBACK:
-                self.connectivity_status[provider] = True
-                self.last_sync_attempt[provider] = datetime.utcnow()
+                self._record_sync(provider, True, time.monotonic())
     
     def get_subject_config(self, subject: SubjectMatter) -> SubjectMatterConfig:
         """Get configuration for a specific subject matter"""
-        return self.subject_configs.get(subject)
+        config = self.subject_configs.get(subject)
+        if config is None and self._raw_subject_configs:
+            raw = self._raw_subject_configs.get(subject.value)
+            if raw is not None:
+                parsed = self._parse_subject_entry(subject, raw)
+                if parsed is not None:
+                    config = self.subject_configs.setdefault(subject, parsed)
+                self._raw_subject_configs.pop(subject.value, None)
+        return config
+    
+    def all_subject_configs(self) -> Dict[SubjectMatter, SubjectMatterConfig]:
+        """Get configurations for every configured subject matter"""
+        self._materialize_subject_configs()
+        return self.subject_configs
+    
+    def get_configs_by_provider(self, provider: AIProvider) -> Tuple[AIModelConfig, ...]:
+        """Primary model configs of every subject that uses provider"""
+        if self._provider_index_version != self.version:
+            index: Dict[AIProvider, List[AIModelConfig]] = {}
+            for config in self.all_subject_configs().values():
+                index.setdefault(config.primary_model.provider, []).append(config.primary_model)
+            self._provider_index = {key: tuple(models) for key, models in index.items()}
+            self._provider_index_version = self.version
+        return self._provider_index.get(provider, ())
     
     def update_subject_config(self, subject: SubjectMatter, config: SubjectMatterConfig):
         """Update configuration for a specific subject matter"""
         self.subject_configs[subject] = config
+        self.version += 1
         self._save_configuration()
     
+    @property
+    def connectivity_status(self) -> Dict[AIProvider, bool]:
+        """Last known connectivity of each checked provider"""
+        conn_status = self._conn_status
+        return {provider: conn_status[provider.ordinal] for provider in self.last_sync_attempt}
+    
+    def _record_sync(self, provider: AIProvider, connected: bool, now: float):
+        """Store the outcome and time of a connectivity check"""
+        attempt = datetime.utcnow()
+        # Either outcome, including "disconnected", is reused for a fixed cooldown
+        self._conn_status[provider.ordinal] = connected
+        self._next_retry[provider.ordinal] = now + CONNECTIVITY_RETRY_SECONDS
+        self.last_sync_attempt[provider] = attempt
+        # Formatted on the next status report, not on every check
+        self._last_sync_iso.pop(provider, None)
+    
     def check_connectivity(self, provider: AIProvider) -> bool:
         """Check if AI provider is accessible"""
-        if provider == AIProvider.FALLBACK:
-            return True
-        
-        # Check if we should retry based on last attempt
-        last_attempt = self.last_sync_attempt.get(provider, datetime.min)
-        if datetime.utcnow() - last_attempt < timedelta(minutes=5):
-            return self.connectivity_status.get(provider, False)
+        # Reuse the last result until its retry deadline (never, for FALLBACK)
+        now = time.monotonic()
+        if now < self._next_retry[provider.ordinal]:
+            return self._conn_status[provider.ordinal]
         
+        # Single-flight: one caller re-checks, concurrent callers keep the last result
+        lock = self._probe_locks[provider.ordinal]
+        if not lock.acquire(blocking=False):
+            return self._conn_status[provider.ordinal]
+        try:
+            return self._probe_connectivity(provider, now)
+        finally:
+            lock.release()
+    
+    def _probe_connectivity(self, provider: AIProvider, now: float) -> bool:
+        """Check a provider now and record the result until its next retry"""
         # Attempt to check connectivity (simplified)
         try:
             # This would be replaced with actual connectivity checks
             # For now, we'll simulate based on environment variables
             if provider == AIProvider.OPENAI:
-                api_key = os.getenv('OPENAI_API_KEY')
-                api_base = os.getenv('OPENAI_API_BASE')
+                api_key = self._env['OPENAI_API_KEY']
+                api_base = self._env['OPENAI_API_BASE']
                 connected = bool(api_key and api_base)
             else:
                 connected = True
             
-            self.connectivity_status[provider] = connected
-            self.last_sync_attempt[provider] = datetime.utcnow()
+            self._record_sync(provider, connected, now)
             
             if connected:
                 logger.info(f"✅ {provider.value} connectivity restored")
@@ -391,15 +661,32 @@ class AIConfigurationManager:
             
         except Exception as e:
             logger.error(f"Connectivity check failed for {provider.value}: {e}")
-            self.connectivity_status[provider] = False
-            self.last_sync_attempt[provider] = datetime.utcnow()
+            self._record_sync(provider, False, now)
             return False
     
+    def _build_fallback_index(self, subject: SubjectMatter) -> Dict[Tuple[Optional[str], Optional[str]], Tuple]:
+        """Group a subject's fallback responses by (context_type, mood) with cumulative weights
+        
+        A None component matches any value, so (None, None) holds every response.
+        """
+        groups: Dict[Tuple[Optional[str], Optional[str]], List[FallbackResponse]] = {}
+        for r in self.fallback_responses.get(subject, ()):
+            for key in ((None, None), (None, r.mood), (r.context_type, None), (r.context_type, r.mood)):
+                groups.setdefault(key, []).append(r)
+        
+        index = {}
+        for key, responses in groups.items():
+            cum_weights = tuple(itertools.accumulate(r.weight for r in responses))
+            index[key] = (tuple(responses), cum_weights, cum_weights[-1])
+        return index
+    
     def get_fallback_response(self, subject: SubjectMatter, context_type: str = "general", mood: str = None) -> FallbackResponse:
         """Get a fallback response for the given subject and context"""
-        responses = self.fallback_responses.get(subject, [])
+        index = self._fallback_index.get(subject)
+        if index is None:
+            index = self._fallback_index[subject] = self._build_fallback_index(subject)
         
-        if not responses:
+        if not index:
             # Return a generic fallback
             return FallbackResponse(
                 subject=subject,
@@ -409,71 +696,125 @@ class AIConfigurationManager:
                 animation_type="bounce"
             )
         
-        # Filter by context type if specified
-        filtered_responses = [r for r in responses if r.context_type == context_type]
-        if not filtered_responses:
-            filtered_responses = responses
+        # Filter by context type if specified, otherwise consider every response
+        if (context_type, None) not in index:
+            context_type = None
         
         # Filter by mood if specified
-        if mood:
-            mood_filtered = [r for r in filtered_responses if r.mood == mood]
-            if mood_filtered:
-                filtered_responses = mood_filtered
+        entry = index.get((context_type, mood)) if mood else None
+        if entry is None:
+            entry = index[(context_type, None)]
         
         # Weighted random selection
-        import random
-        weights = [r.weight for r in filtered_responses]
-        selected = random.choices(filtered_responses, weights=weights, k=1)[0]
-        
-        return selected
+        responses, cum_weights, total = entry
+        return responses[_bisect_right(cum_weights, _random() * total, 0, len(responses) - 1)]
     
     def add_fallback_response(self, response: FallbackResponse):
         """Add a new fallback response"""
-        if response.subject not in self.fallback_responses:
-            self.fallback_responses[response.subject] = []
+        fallback_responses = self.fallback_responses
+        fallback_responses[response.subject] = fallback_responses.get(response.subject, ()) + (response,)
+        self._fallback_index.pop(response.subject, None)
+    
+    @staticmethod
+    def make_cache_key(model_name: str, system_prompt: str, context: Any,
+                       temperature: float, max_tokens: int, subject: str = '') -> bytes:
+        """Hash the model and prompt inputs to a 16-byte response cache key
         
-        self.fallback_responses[response.subject].append(response)
+        context may be passed already serialized (str or bytes) to avoid
+        encoding it again; otherwise it is hashed as canonical JSON.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        for part in (subject, model_name, system_prompt, repr(temperature), repr(max_tokens)):
+            h.update(part.encode('utf-8'))
+            h.update(b'\x1f')
+        if isinstance(context, str):
+            context = context.encode('utf-8')
+        elif not isinstance(context, bytes):
+            context = _canonical_json(context)
+        h.update(context)
+        return h.digest()
     
-    def cache_response(self, cache_key: str, response: Any, duration_hours: int = 24):
+    def cache_response(self, cache_key: bytes, response: Any, duration_hours: int = 24):
         """Cache an AI response"""
-        expiry = datetime.utcnow() + timedelta(hours=duration_hours)
-        self.response_cache[cache_key] = {
-            'response': response,
-            'expiry': expiry
-        }
+        expiry = time.monotonic() + duration_hours * 3600
+        self.response_cache[cache_key] = (response, expiry)
+        self.response_cache.move_to_end(cache_key)
+        heapq.heappush(self._cache_heap, (expiry, cache_key))
+        
+        self._reap_expired()
+        while len(self.response_cache) > self._cache_max:
+            self.response_cache.popitem(last=False)
     
-    def get_cached_response(self, cache_key: str) -> Optional[Any]:
+    def get_cached_response(self, cache_key: bytes) -> Optional[Any]:
         """Get a cached response if still valid"""
         cached = self.response_cache.get(cache_key)
-        if cached and datetime.utcnow() < cached['expiry']:
-            return cached['response']
+        if cached is None:
+            return None
         
-        # Remove expired cache
-        if cached:
-            del self.response_cache[cache_key]
+        response, expiry = cached
+        if time.monotonic() < expiry:
+            self.response_cache.move_to_end(cache_key)
+            return response
         
+        # Remove expired cache
+        del self.response_cache[cache_key]
         return None
     
+    def _reap_expired(self):
+        """Drop every cached response whose expiry has passed"""
+        heap = self._cache_heap
+        now = time.monotonic()
+        while heap and heap[0][0] <= now:
+            expiry, cache_key = heapq.heappop(heap)
+            cached = self.response_cache.get(cache_key)
+            # Skip heap entries left behind by a later re-cache of the key
+            if cached is not None and cached[1] == expiry:
+                del self.response_cache[cache_key]
+        
+        # Entries evicted by the LRU cap leave stale heap items; rebuild occasionally
+        if len(heap) > 2 * self._cache_max:
+            self._cache_heap = [(expiry, key) for key, (_, expiry) in self.response_cache.items()]
+            heapq.heapify(self._cache_heap)
+    
     def clear_cache(self):
         """Clear all cached responses"""
         self.response_cache.clear()
+        self._cache_heap.clear()
+        self.version += 1
+    
+    def _last_sync_strings(self) -> Dict[str, str]:
+        """ISO strings of the last sync attempts by provider value, formatted once per attempt"""
+        last_sync_iso = self._last_sync_iso
+        for provider, attempt in self.last_sync_attempt.items():
+            if provider not in last_sync_iso:
+                last_sync_iso[provider] = attempt.isoformat()
+        return {_PROVIDER_VALUE[provider]: last_sync_iso[provider] for provider in self.last_sync_attempt}
     
     def get_status_report(self) -> Dict:
         """Get a status report of all AI providers and configurations"""
         return {
             'connectivity_status': {
-                provider.value: status for provider, status in self.connectivity_status.items()
-            },
-            'last_sync_attempts': {
-                provider.value: attempt.isoformat() for provider, attempt in self.last_sync_attempt.items()
+                _PROVIDER_VALUE[provider]: status for provider, status in self.connectivity_status.items()
             },
-            'configured_subjects': [subject.value for subject in self.subject_configs.keys()],
+            'last_sync_attempts': self._last_sync_strings(),
+            'configured_subjects': [_SUBJECT_VALUE[subject] for subject in self.all_subject_configs()],
             'fallback_responses_count': {
-                subject.value: len(responses) for subject, responses in self.fallback_responses.items()
+                _SUBJECT_VALUE[subject]: len(responses) for subject, responses in self.fallback_responses.items()
             },
             'cache_size': len(self.response_cache)
         }
 
-# Global configuration manager instance
-ai_config_manager = AIConfigurationManager()
+# Global configuration manager instance, created on first access
+_manager_lock = threading.Lock()
+
+def __getattr__(name):
+    if name != 'ai_config_manager':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    with _manager_lock:
+        manager = globals().get('ai_config_manager')
+        if manager is None:
+            manager = AIConfigurationManager()
+            globals()['ai_config_manager'] = manager
+    return manager
 
@@ -7,26 +7,92 @@ import os
 import json
 import time
 import asyncio
+import atexit
+import concurrent.futures
+import threading
 import logging
+import random
+import re
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-import hashlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
 
 from src.config.ai_config import (
     ai_config_manager, 
     AIProvider, 
     SubjectMatter, 
     AIModelConfig,
+    SubjectMatterConfig,
     FallbackResponse
 )
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Connectivity probe tuning (seconds)
+PROBE_TIMEOUT = 3
+PROBE_ATTEMPTS = 2
+PROBE_BACKOFF = 0.1
+CIRCUIT_MAX_OPEN = 30
+
+# Generation retries: full-jitter exponential backoff capped at RETRY_MAX_DELAY,
+# within a total budget of RETRY_BUDGET_FACTOR * the model timeout
+RETRY_MAX_DELAY = 8
+RETRY_BUDGET_FACTOR = 2
+
+# Upper bound on concurrent AI calls while syncing fallback responses
+SYNC_CONCURRENCY = 8
+
+# Common scenarios a sync generates fresh fallback responses for
+SYNC_SCENARIOS = (
+    {"context_type": "general", "mood": "cheerful"},
+    {"context_type": "celebration", "mood": "excited"},
+    {"context_type": "encouragement", "mood": "supportive"}
+)
+
+def _context_json(context: Dict) -> str:
+    """Serialize a request context as sorted-key JSON"""
+    if orjson is not None:
+        return orjson.dumps(
+            context, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(context, sort_keys=True, default=str)
+
+# Mood/animation hints by keyword, in priority order
+_MOOD_KEYWORDS = (
+    (("amazing", "incredible", "fantastic"), ("excited", "celebration_bounce")),
+    (("gentle", "soft", "calm"), ("gentle", "gentle_sway")),
+    (("celebrate", "party", "woohoo"), ("celebratory", "confetti_explosion")),
+)
+_MOOD_BY_WORD = {
+    word: (rank, hint)
+    for rank, (words, hint) in enumerate(_MOOD_KEYWORDS)
+    for word in words
+}
+# ASCII-only case folding, so every match lowercases to a _MOOD_BY_WORD key
+_MOOD_PATTERN = re.compile("|".join(_MOOD_BY_WORD), re.IGNORECASE | re.ASCII)
+
 class AIServiceError(Exception):
     """Custom exception for AI service errors"""
     pass
 
+class TransientAIError(AIServiceError):
+    """AI call failure worth retrying (timeouts, rate limits, server errors)"""
+    pass
+
+class PermanentAIError(AIServiceError):
+    """AI call failure that will recur on retry (bad request, auth, parsing)"""
+    pass
+
 class AIResponse:
     """Standardized AI response object"""
     
@@ -38,7 +104,12 @@ class AIResponse:
         self.mood = mood
         self.source = source  # 'ai', 'fallback', 'cache'
         self.metadata = metadata or {}
-        self.timestamp = datetime.utcnow()
+        # Creation time in epoch milliseconds; formatted only when serialized
+        self.timestamp_ms = time.time_ns() // 1_000_000
+    
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.utcfromtimestamp(self.timestamp_ms / 1000)
     
     def to_dict(self) -> Dict:
         return {
@@ -50,6 +121,56 @@ class AIResponse:
             'timestamp': self.timestamp.isoformat()
         }
 
+class RedisResponseCache:
+    """AI responses shared across workers through Redis
+    
+    Sits behind the in-process cache: reads cost one round trip on a local
+    miss, and writes are issued in the background so they never delay the
+    response.
+    """
+    
+    def __init__(self, url: str, prefix: bytes = b'ai:response:'):
+        self.client = aioredis.from_url(url)
+        self.prefix = prefix
+        # Strong references to in-flight writes so they aren't collected
+        self._pending = set()
+    
+    async def get(self, cache_key: bytes) -> Optional[AIResponse]:
+        try:
+            data = await self.client.get(self.prefix + cache_key)
+        except Exception as e:
+            logger.warning(f"Shared response cache read failed: {e}")
+            return None
+        if data is None:
+            return None
+        fields = orjson.loads(data) if orjson is not None else json.loads(data)
+        return AIResponse(**fields)
+    
+    def set_later(self, cache_key: bytes, response: AIResponse, ttl_seconds: int):
+        """Store a response without waiting for Redis"""
+        fields = {
+            'text': response.text,
+            'animation_type': response.animation_type,
+            'mood': response.mood,
+            'source': response.source,
+            'metadata': response.metadata
+        }
+        data = orjson.dumps(fields, default=str) if orjson is not None else json.dumps(fields, default=str)
+        task = asyncio.get_running_loop().create_task(self._set(cache_key, data, ttl_seconds))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _set(self, cache_key: bytes, data, ttl_seconds: int):
+        try:
+            await self.client.set(self.prefix + cache_key, data, ex=ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Shared response cache write failed: {e}")
+    
+    async def aclose(self):
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await self.client.aclose()
+
 class OpenAIProvider:
     """OpenAI API provider implementation"""
     
@@ -61,15 +182,29 @@ class OpenAIProvider:
     def _initialize_client(self):
         """Initialize OpenAI client"""
         try:
+            import httpx
             import openai
+            from openai import AsyncOpenAI
             
-            # Set API configuration
-            if self.config.api_key:
-                openai.api_key = self.config.api_key
-            if self.config.api_base:
-                openai.api_base = self.config.api_base
-            
-            self.client = openai
+            # One client per provider so requests share its connection pool
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_keepalive_connections
+                ),
+                timeout=httpx.Timeout(self.config.timeout)
+            )
+            self.client = AsyncOpenAI(
+                api_key=self.config.api_key,
+                base_url=self.config.api_base or None,
+                http_client=http_client
+            )
+            self._transient_errors = (
+                openai.RateLimitError,
+                openai.APITimeoutError,
+                openai.APIConnectionError,
+                openai.InternalServerError
+            )
             logger.info("OpenAI client initialized successfully")
             
         except ImportError:
@@ -79,9 +214,21 @@ class OpenAIProvider:
             logger.error(f"Failed to initialize OpenAI client: {e}")
             raise AIServiceError(f"OpenAI initialization failed: {e}")
     
+    async def aclose(self):
+        """Close the client's HTTP connection pool"""
+        if self.client is not None:
+            await self.client.close()
+    
     async def generate_response(self, system_prompt: str, user_prompt: str, 
-                              context: Dict = None) -> AIResponse:
-        """Generate response using OpenAI API"""
+                              context: Dict = None, context_json: str = None,
+                              timeout: float = None) -> AIResponse:
+        """Generate response using OpenAI API
+        
+        context_json, when given, is context already serialized as JSON.
+        timeout, when given, caps the call below the configured model timeout.
+        """
+        if timeout is None or timeout > self.config.timeout:
+            timeout = self.config.timeout
         try:
             messages = [
                 {"role": "system", "content": system_prompt},
@@ -90,19 +237,20 @@ class OpenAIProvider:
             
             # Add context if provided
             if context:
-                context_str = f"Context: {json.dumps(context, default=str)}"
+                if context_json is None:
+                    context_json = _context_json(context)
+                context_str = f"Context: {context_json}"
                 messages.append({"role": "user", "content": context_str})
             
             # Make API call with timeout
             response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self.client.ChatCompletion.create,
+                self.client.chat.completions.create(
                     model=self.config.model_name,
                     messages=messages,
                     max_tokens=self.config.max_tokens,
                     temperature=self.config.temperature
                 ),
-                timeout=self.config.timeout
+                timeout=timeout
             )
             
             # Extract response text
@@ -119,32 +267,34 @@ class OpenAIProvider:
                 metadata={
                     "model": self.config.model_name,
                     "provider": "openai",
-                    "tokens_used": response.usage.total_tokens if hasattr(response, 'usage') else None
+                    "tokens_used": response.usage.total_tokens if response.usage else None
                 }
             )
             
         except asyncio.TimeoutError:
-            logger.warning(f"OpenAI API timeout after {self.config.timeout}s")
-            raise AIServiceError("AI service timeout")
+            logger.warning(f"OpenAI API timeout after {timeout:g}s")
+            raise TransientAIError("AI service timeout")
+        except self._transient_errors as e:
+            logger.warning(f"OpenAI API transient error: {e}")
+            raise TransientAIError(f"AI generation failed: {e}")
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
-            raise AIServiceError(f"AI generation failed: {e}")
+            raise PermanentAIError(f"AI generation failed: {e}")
     
     def _parse_response_metadata(self, response_text: str) -> tuple:
         """Parse mood and animation hints from response text"""
         mood = "cheerful"
         animation = "bounce"
         
-        # Simple keyword-based parsing
-        if any(word in response_text.lower() for word in ["amazing", "incredible", "fantastic"]):
-            mood = "excited"
-            animation = "celebration_bounce"
-        elif any(word in response_text.lower() for word in ["gentle", "soft", "calm"]):
-            mood = "gentle"
-            animation = "gentle_sway"
-        elif any(word in response_text.lower() for word in ["celebrate", "party", "woohoo"]):
-            mood = "celebratory"
-            animation = "confetti_explosion"
+        # Single keyword scan; the highest-priority keyword found wins
+        best_rank = len(_MOOD_KEYWORDS)
+        for match in _MOOD_PATTERN.finditer(response_text):
+            rank, hint = _MOOD_BY_WORD[match.group().lower()]
+            if rank < best_rank:
+                best_rank = rank
+                mood, animation = hint
+                if rank == 0:
+                    break
         
         return mood, animation
 
@@ -154,16 +304,26 @@ class AIService:
     def __init__(self):
         self.providers = {}
         self.config_manager = ai_config_manager
+        # Per-provider circuit breaker state for connectivity probes
+        self._circuits = {
+            provider: {'fail_count': 0, 'open_until': 0.0}
+            for provider in AIProvider if provider != AIProvider.FALLBACK
+        }
+        self._sync_semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+        # Pending AI generations by cache key, shared by identical requests
+        self._inflight: Dict[bytes, asyncio.Task] = {}
+        # Optional cross-worker response cache
+        redis_url = os.getenv('AI_CACHE_REDIS_URL')
+        self.shared_cache = RedisResponseCache(redis_url) if aioredis is not None and redis_url else None
         self._initialize_providers()
+        # Provider names for status payloads, fixed once providers are set up
+        self._provider_names = tuple(p.value for p in self.providers)
     
     def _initialize_providers(self):
         """Initialize all configured AI providers"""
         try:
             # Initialize OpenAI provider if configured
-            openai_configs = [
-                config.primary_model for config in self.config_manager.subject_configs.values()
-                if config.primary_model.provider == AIProvider.OPENAI
-            ]
+            openai_configs = self.config_manager.get_configs_by_provider(AIProvider.OPENAI)
             
             if openai_configs:
                 sample_config = openai_configs[0]
@@ -173,20 +333,22 @@ class AIService:
         except Exception as e:
             logger.error(f"Failed to initialize AI providers: {e}")
     
-    def _generate_cache_key(self, subject: SubjectMatter, context: Dict) -> str:
-        """Generate cache key for response caching"""
-        context_str = json.dumps(context, sort_keys=True, default=str)
-        cache_input = f"{subject.value}:{context_str}"
-        return hashlib.md5(cache_input.encode()).hexdigest()
+    def _generate_cache_key(self, config: SubjectMatterConfig, context_json: str) -> bytes:
+        """Generate cache key for response caching from the serialized context"""
+        model = config.primary_model
+        return self.config_manager.make_cache_key(
+            model.model_name, config.system_prompt, context_json,
+            model.temperature, model.max_tokens, subject=config.subject.value
+        )
     
-    def _format_user_prompt(self, subject: SubjectMatter, context: Dict) -> str:
+    def _format_user_prompt(self, config: SubjectMatterConfig, context: Dict) -> str:
         """Format user prompt using subject configuration template"""
-        config = self.config_manager.get_subject_config(subject)
-        if not config or not config.context_template:
+        subject = config.subject
+        if not config.context_template:
             return f"Generate a response for {subject.value} with context: {context}"
         
         try:
-            return config.context_template.format(**context)
+            return config.compiled_context(context)
         except KeyError as e:
             logger.warning(f"Missing context key {e} for {subject.value}")
             return f"Generate a response for {subject.value} with available context: {context}"
@@ -211,14 +373,26 @@ class AIService:
             logger.error(f"No configuration found for subject: {subject}")
             return self._get_fallback_response(subject, context)
         
+        # Serialized once for the cache key and the provider request
+        context_json = _context_json(context)
+        cache_key = self._generate_cache_key(config, context_json)
+        
         # Check cache first (unless forcing AI)
         if not force_ai and config.cache_responses:
-            cache_key = self._generate_cache_key(subject, context)
             cached_response = self.config_manager.get_cached_response(cache_key)
+            if cached_response is None and self.shared_cache is not None:
+                cached_response = await self.shared_cache.get(cache_key)
+                if cached_response is not None:
+                    self.config_manager.cache_response(cache_key, cached_response, config.cache_duration_hours)
             if cached_response:
                 logger.info(f"Using cached response for {subject.value}")
-                cached_response['source'] = 'cache'
-                return AIResponse(**cached_response)
+                return AIResponse(
+                    text=cached_response.text,
+                    animation_type=cached_response.animation_type,
+                    mood=cached_response.mood,
+                    source='cache',
+                    metadata=cached_response.metadata
+                )
         
         # Try primary AI model
         try:
@@ -227,69 +401,102 @@ class AIService:
                 provider_available = self.config_manager.check_connectivity(config.primary_model.provider)
                 if not provider_available:
                     logger.warning(f"Primary provider {config.primary_model.provider.value} unavailable")
-                    return await self._try_fallback_model(subject, context, config)
+                    return await self._try_fallback_model(subject, context, config, context_json)
             
             # Generate AI response
-            ai_response = await self._generate_ai_response(config, context)
+            ai_response = await self._coalesced_ai_response(cache_key, config, context, context_json)
             
             # Cache the response
             if config.cache_responses:
-                cache_key = self._generate_cache_key(subject, context)
                 self.config_manager.cache_response(
                     cache_key, 
-                    ai_response.to_dict(), 
+                    ai_response, 
                     config.cache_duration_hours
                 )
+                if self.shared_cache is not None:
+                    self.shared_cache.set_later(cache_key, ai_response, config.cache_duration_hours * 3600)
             
             logger.info(f"Generated AI response for {subject.value}")
             return ai_response
             
         except AIServiceError as e:
             logger.warning(f"AI generation failed for {subject.value}: {e}")
-            return await self._try_fallback_model(subject, context, config)
+            return await self._try_fallback_model(subject, context, config, context_json)
         except Exception as e:
             logger.error(f"Unexpected error generating AI response: {e}")
             return self._get_fallback_response(subject, context)
     
-    async def _generate_ai_response(self, config, context: Dict) -> AIResponse:
+    async def _coalesced_ai_response(self, cache_key: bytes, config, context: Dict,
+                                     context_json: str = None) -> AIResponse:
+        """Generate an AI response, sharing one in-flight call between identical requests"""
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(cache_key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._generate_ai_response(config, context, context_json))
+            self._inflight[cache_key] = task
+            
+            def forget(done, key=cache_key):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+            task.add_done_callback(forget)
+        
+        # Shielded so one caller timing out doesn't cancel the others' call
+        return await asyncio.shield(task)
+    
+    async def _generate_ai_response(self, config, context: Dict, context_json: str = None) -> AIResponse:
         """Generate response using configured AI model"""
         provider = self.providers.get(config.primary_model.provider)
         if not provider:
             raise AIServiceError(f"Provider {config.primary_model.provider.value} not available")
         
-        user_prompt = self._format_user_prompt(config.subject, context)
+        user_prompt = self._format_user_prompt(config, context)
         
-        # Retry logic
+        # Retry transient failures only; permanent ones propagate immediately
+        model = config.primary_model
+        deadline = time.monotonic() + model.timeout * RETRY_BUDGET_FACTOR
         last_error = None
-        for attempt in range(config.primary_model.retry_attempts):
+        for attempt in range(model.retry_attempts):
+            # Each attempt only gets what is left of the overall budget
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
             try:
                 response = await provider.generate_response(
                     config.system_prompt,
                     user_prompt,
-                    context
+                    context,
+                    context_json,
+                    timeout=remaining
                 )
                 return response
                 
-            except AIServiceError as e:
+            except TransientAIError as e:
                 last_error = e
-                if attempt < config.primary_model.retry_attempts - 1:
-                    await asyncio.sleep(config.primary_model.retry_delay * (attempt + 1))
-                    logger.info(f"Retrying AI generation (attempt {attempt + 2})")
+                if attempt == model.retry_attempts - 1:
+                    break
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, model.retry_delay * 2 ** attempt))
+                remaining = deadline - time.monotonic()
+                if delay >= remaining:
+                    break
+                await asyncio.sleep(delay)
+                logger.info(f"Retrying AI generation (attempt {attempt + 2})")
         
         raise last_error or AIServiceError("AI generation failed after retries")
     
-    async def _try_fallback_model(self, subject: SubjectMatter, context: Dict, config) -> AIResponse:
+    async def _try_fallback_model(self, subject: SubjectMatter, context: Dict, config,
+                                  context_json: str = None) -> AIResponse:
         """Try fallback AI model if configured"""
         if config.fallback_model and config.fallback_model.provider != AIProvider.FALLBACK:
             try:
                 # Try fallback AI model
                 fallback_provider = self.providers.get(config.fallback_model.provider)
                 if fallback_provider:
-                    user_prompt = self._format_user_prompt(subject, context)
+                    user_prompt = self._format_user_prompt(config, context)
                     response = await fallback_provider.generate_response(
                         config.system_prompt,
                         user_prompt,
-                        context
+                        context,
+                        context_json
                     )
                     response.source = "fallback_ai"
                     logger.info(f"Used fallback AI model for {subject.value}")
@@ -319,77 +526,163 @@ class AIService:
             }
         )
     
+    async def aclose(self):
+        """Release provider and shared cache connection pools"""
+        for provider in self.providers.values():
+            await provider.aclose()
+        if self.shared_cache is not None:
+            await self.shared_cache.aclose()
+    
     def get_service_status(self) -> Dict:
         """Get comprehensive service status"""
         return {
             "ai_service_status": "operational",
-            "providers_initialized": list(self.providers.keys()),
+            "providers_initialized": list(self._provider_names),
             "configuration_status": self.config_manager.get_status_report(),
             "timestamp": datetime.utcnow().isoformat()
         }
     
     async def test_connectivity(self) -> Dict:
         """Test connectivity to all configured providers"""
-        results = {}
+        # Probe every provider concurrently; wall time is the slowest probe
+        probed = [provider for provider in AIProvider if provider != AIProvider.FALLBACK]
+        statuses = await asyncio.gather(*(self._probe_provider(provider) for provider in probed))
         
-        for provider in AIProvider:
-            if provider == AIProvider.FALLBACK:
-                results[provider.value] = {"status": "always_available", "response_time": 0}
-                continue
-            
-            start_time = time.time()
+        statuses = iter(statuses)
+        return {
+            provider.value: {"status": "always_available", "response_time": 0}
+            if provider == AIProvider.FALLBACK else next(statuses)
+            for provider in AIProvider
+        }
+    
+    async def _probe_provider(self, provider: AIProvider) -> Dict:
+        """Probe one provider with retries, skipping providers whose circuit is open"""
+        circuit = self._circuits[provider]
+        if time.monotonic() < circuit['open_until']:
+            return {"status": "circuit_open", "response_time": 0}
+        
+        start_time = time.time()
+        for attempt in range(PROBE_ATTEMPTS):
             try:
-                connected = self.config_manager.check_connectivity(provider)
-                response_time = time.time() - start_time
-                
-                results[provider.value] = {
-                    "status": "connected" if connected else "disconnected",
-                    "response_time": response_time
-                }
+                connected = await asyncio.wait_for(
+                    asyncio.to_thread(self.config_manager.check_connectivity, provider),
+                    timeout=PROBE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                error = f"probe timed out after {PROBE_TIMEOUT}s"
             except Exception as e:
-                results[provider.value] = {
-                    "status": "error",
-                    "error": str(e),
-                    "response_time": time.time() - start_time
-                }
+                error = str(e)
+            else:
+                if connected:
+                    circuit['fail_count'] = 0
+                    return {"status": "connected", "response_time": time.time() - start_time}
+                
+                # A definite "disconnected" answer is not retried, but still opens the circuit
+                self._open_circuit(circuit)
+                return {"status": "disconnected", "response_time": time.time() - start_time}
+            
+            if attempt < PROBE_ATTEMPTS - 1:
+                await asyncio.sleep(PROBE_BACKOFF * 2 ** attempt)
+        
+        self._open_circuit(circuit)
+        logger.warning(f"Connectivity probe failed for {provider.value}: {error}")
+        
+        return {
+            "status": "error",
+            "error": error,
+            "response_time": time.time() - start_time
+        }
+    
+    @staticmethod
+    def _open_circuit(circuit: Dict):
+        """Stop probing a provider for an exponentially growing cooldown"""
+        circuit['fail_count'] += 1
+        circuit['open_until'] = time.monotonic() + min(CIRCUIT_MAX_OPEN, 2 ** circuit['fail_count'])
+    
+    async def _sync_scenario(self, subject: SubjectMatter, scenario: Dict):
+        """Generate one scenario's response and keep it as a fallback if it came from AI"""
+        async with self._sync_semaphore:
+            response = await self.generate_response(subject, scenario, force_ai=True)
+        
+        if response.source == "ai":
+            # Add as new fallback response
+            fallback = FallbackResponse(
+                subject=subject,
+                context_type=scenario["context_type"],
+                mood=response.mood,
+                response_text=response.text,
+                animation_type=response.animation_type,
+                weight=1
+            )
+            self.config_manager.add_fallback_response(fallback)
+    
+    async def sync_subject(self, subject: SubjectMatter, force: bool = False) -> str:
+        """Sync fallback responses for a single subject matter"""
+        # Generate fresh responses for common scenarios, concurrently
+        results = await asyncio.gather(
+            *(self._sync_scenario(subject, scenario) for scenario in SYNC_SCENARIOS),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
         
-        return results
+        return "synced"
     
     async def sync_with_ai(self, force: bool = False) -> Dict:
         """Sync fallback responses with AI models"""
-        sync_results = {}
+        subjects = list(SubjectMatter)
+        results = await asyncio.gather(
+            *(self.sync_subject(subject, force) for subject in subjects),
+            return_exceptions=True
+        )
         
-        for subject in SubjectMatter:
-            try:
-                # Generate fresh responses for common scenarios
-                scenarios = [
-                    {"context_type": "general", "mood": "cheerful"},
-                    {"context_type": "celebration", "mood": "excited"},
-                    {"context_type": "encouragement", "mood": "supportive"}
-                ]
-                
-                for scenario in scenarios:
-                    response = await self.generate_response(subject, scenario, force_ai=True)
-                    if response.source == "ai":
-                        # Add as new fallback response
-                        fallback = FallbackResponse(
-                            subject=subject,
-                            context_type=scenario["context_type"],
-                            mood=response.mood,
-                            response_text=response.text,
-                            animation_type=response.animation_type,
-                            weight=1
-                        )
-                        self.config_manager.add_fallback_response(fallback)
-                        
-                sync_results[subject.value] = "synced"
-                
-            except Exception as e:
-                logger.error(f"Failed to sync {subject.value}: {e}")
-                sync_results[subject.value] = f"error: {e}"
+        sync_results = {}
+        for subject, result in zip(subjects, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to sync {subject.value}: {result}")
+                result = f"error: {result}"
+            sync_results[subject.value] = result
         
         return sync_results
 
 # Global AI service instance
 ai_service = AIService()
 
+# Single event loop shared by all Flask worker threads, so provider clients
+# and their connection pools stay bound to one loop between requests
+_LOOP = None
+_LOOP_LOCK = threading.Lock()
+
+# Upper bound (seconds) a worker thread may wait on an AI coroutine
+AI_REQUEST_TIMEOUT = 30
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background loop, starting its thread on first use"""
+    global _LOOP
+    if _LOOP is None:
+        with _LOOP_LOCK:
+            if _LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='ai-service-loop', daemon=True).start()
+                atexit.register(_shutdown_loop, loop)
+                _LOOP = loop
+    return _LOOP
+
+def _shutdown_loop(loop: asyncio.AbstractEventLoop):
+    """Close provider connection pools, then stop the loop"""
+    try:
+        asyncio.run_coroutine_threadsafe(ai_service.aclose(), loop).result(5)
+    except Exception:
+        # Best effort: the process is exiting either way
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+
+def run_async(coro, timeout: Optional[float] = AI_REQUEST_TIMEOUT):
+    """Run a coroutine on the shared loop from synchronous (Flask) code"""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
@@ -1,68 +1,119 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, request, current_app
 from werkzeug.security import check_password_hash
 import jwt
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
 from functools import wraps
 from src.models.user import User, db
+from src.utils import json_response
 
 auth_bp = Blueprint('auth', __name__)
 
+def init_auth(app):
+    """Bind the app's SECRET_KEY for token signing and verification
+    
+    Must be called once per app before any token is issued or checked.
+    """
+    app.extensions['auth_secret_key'] = app.config['SECRET_KEY']
+
+def _signing_key():
+    """The key bound to the current app by init_auth
+    
+    Looked up per app rather than held in a module global so that several
+    apps (e.g. in tests) never share a key.
+    """
+    return current_app.extensions['auth_secret_key']
+
+# Verified token claims, keyed by (signing key, token digest): {key: (valid_until, claims)}
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_SIZE = 1024
+_token_cache = {}
+_token_cache_lock = threading.Lock()
+
+def _token_cache_key(secret, token):
+    return secret, hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def decode_token(token):
+    """Decode and verify a JWT, reusing the claims of recently verified tokens"""
+    secret = _signing_key()
+    key = _token_cache_key(secret, token)
+    now = time.time()
+    cached = _token_cache.get(key)
+    if cached and now < cached[0]:
+        return cached[1]
+    
+    data = jwt.decode(token, secret, algorithms=['HS256'])
+    with _token_cache_lock:
+        if len(_token_cache) >= TOKEN_CACHE_SIZE:
+            del _token_cache[next(iter(_token_cache))]
+        _token_cache[key] = (min(now + TOKEN_CACHE_TTL, data.get('exp', now)), data)
+    return data
+
+def forget_token(token):
+    """Drop a token from the verification cache"""
+    with _token_cache_lock:
+        _token_cache.pop(_token_cache_key(_signing_key(), token), None)
+
+def _auth_error(message):
+    return json_response({
+        'success': False,
+        'message': message,
+        'data': None,
+        'errors': []
+    }, 401)
+
+def _verified_claims():
+    """Decode the request's bearer token, returning (claims, error_response)"""
+    token = None
+    
+    # Check for token in Authorization header
+    if 'Authorization' in request.headers:
+        auth_header = request.headers['Authorization']
+        try:
+            token = auth_header.split(" ")[1]  # Bearer <token>
+        except IndexError:
+            return None, _auth_error('Invalid token format')
+    
+    if not token:
+        return None, _auth_error('Token is missing')
+    
+    try:
+        return decode_token(token), None
+    except jwt.ExpiredSignatureError:
+        return None, _auth_error('Token has expired')
+    except jwt.InvalidTokenError:
+        return None, _auth_error('Invalid token')
+
 def token_required(f):
     """Decorator to require JWT token for protected routes"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Check for token in Authorization header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]  # Bearer <token>
-            except IndexError:
-                return jsonify({
-                    'success': False,
-                    'message': 'Invalid token format',
-                    'data': None,
-                    'errors': []
-                }), 401
-        
-        if not token:
-            return jsonify({
-                'success': False,
-                'message': 'Token is missing',
-                'data': None,
-                'errors': []
-            }), 401
+        data, error = _verified_claims()
+        if error:
+            return error
         
-        try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
-            if not current_user:
-                return jsonify({
-                    'success': False,
-                    'message': 'Invalid token',
-                    'data': None,
-                    'errors': []
-                }), 401
-        except jwt.ExpiredSignatureError:
-            return jsonify({
-                'success': False,
-                'message': 'Token has expired',
-                'data': None,
-                'errors': []
-            }), 401
-        except jwt.InvalidTokenError:
-            return jsonify({
-                'success': False,
-                'message': 'Invalid token',
-                'data': None,
-                'errors': []
-            }), 401
+        current_user = User.query.get(data['user_id'])
+        if not current_user:
+            return _auth_error('Invalid token')
         
         return f(current_user, *args, **kwargs)
     
     return decorated
 
+def token_required_claims(f):
+    """Decorator for routes that only need the token's claims, not the user row"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        claims, error = _verified_claims()
+        if error:
+            return error
+        
+        return f(claims, *args, **kwargs)
+    
+    return decorated
+
 def generate_token(user_id):
     """Generate JWT token for user"""
     payload = {
@@ -70,7 +121,7 @@ def generate_token(user_id):
         'exp': datetime.utcnow() + timedelta(days=7),  # Token expires in 7 days
         'iat': datetime.utcnow()
     }
-    return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
+    return jwt.encode(payload, _signing_key(), algorithm='HS256')
 
 @auth_bp.route('/auth/register', methods=['POST'])
 def register():
@@ -90,38 +141,42 @@ def register():
                 })
         
         if errors:
-            return jsonify({
+            return json_response({
                 'success': False,
                 'message': 'Validation failed',
                 'data': None,
                 'errors': errors
-            }), 422
+            }, 422)
+        
+        # Check if user already exists; at most one row can match each field
+        existing = User.query.filter(
+            (User.email == data['email']) | (User.username == data['username'])
+        ).with_entities(User.email, User.username).limit(2).all()
         
-        # Check if user already exists
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({
+        if any(row.email == data['email'] for row in existing):
+            return json_response({
                 'success': False,
                 'message': 'Email already registered',
                 'data': None,
                 'errors': [{'field': 'email', 'message': 'Email already exists'}]
-            }), 422
+            }, 422)
         
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({
+        if existing:
+            return json_response({
                 'success': False,
                 'message': 'Username already taken',
                 'data': None,
                 'errors': [{'field': 'username', 'message': 'Username already exists'}]
-            }), 422
+            }, 422)
         
         # Validate password strength
         if len(data['password']) < 8:
-            return jsonify({
+            return json_response({
                 'success': False,
                 'message': 'Password too weak',
                 'data': None,
                 'errors': [{'field': 'password', 'message': 'Password must be at least 8 characters'}]
-            }), 422
+            }, 422)
         
         # Create new user
         user = User(
@@ -136,7 +191,7 @@ def register():
         # Generate token
         token = generate_token(user.id)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'User registered successfully',
             'data': {
@@ -144,16 +199,16 @@ def register():
                 'token': token
             },
             'errors': []
-        }), 201
+        }, 201)
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Registration failed',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @auth_bp.route('/auth/login', methods=['POST'])
 def login():
@@ -163,23 +218,23 @@ def login():
         
         # Validate required fields
         if not data.get('email') or not data.get('password'):
-            return jsonify({
+            return json_response({
                 'success': False,
                 'message': 'Email and password are required',
                 'data': None,
                 'errors': []
-            }), 422
+            }, 422)
         
         # Find user by email
         user = User.query.filter_by(email=data['email']).first()
         
         if not user or not user.check_password(data['password']):
-            return jsonify({
+            return json_response({
                 'success': False,
                 'message': 'Invalid email or password',
                 'data': None,
                 'errors': []
-            }), 401
+            }, 401)
         
         # Update last login
         user.last_login = datetime.utcnow()
@@ -188,7 +243,7 @@ def login():
         # Generate token
         token = generate_token(user.id)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'Login successful',
             'data': {
@@ -196,62 +251,64 @@ def login():
                 'token': token
             },
             'errors': []
-        }), 200
+        })
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Login failed',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @auth_bp.route('/auth/me', methods=['GET'])
 @token_required
 def get_current_user(current_user):
     """Get current user profile information"""
-    return jsonify({
+    return json_response({
         'success': True,
         'message': 'User profile retrieved',
         'data': {
             'user': current_user.to_dict()
         },
         'errors': []
-    }), 200
+    })
 
 @auth_bp.route('/auth/logout', methods=['POST'])
-@token_required
-def logout(current_user):
+@token_required_claims
+def logout(claims):
     """Logout user (client should discard token)"""
-    return jsonify({
+    forget_token(request.headers['Authorization'].split(" ")[1])
+    
+    return json_response({
         'success': True,
         'message': 'Logout successful',
         'data': None,
         'errors': []
-    }), 200
+    })
 
 @auth_bp.route('/auth/refresh', methods=['POST'])
-@token_required
-def refresh_token(current_user):
+@token_required_claims
+def refresh_token(claims):
     """Refresh JWT token"""
     try:
         # Generate new token
-        token = generate_token(current_user.id)
+        token = generate_token(claims['user_id'])
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'Token refreshed',
             'data': {
                 'token': token
             },
             'errors': []
-        }), 200
+        })
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Token refresh failed',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
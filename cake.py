@@ -1,55 +1,256 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, request, current_app
 from datetime import datetime
+import atexit
+import functools
+import logging
+import queue
 import random
-import asyncio
-from src.models.user import db
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import bindparam
+from src.models.user import db, User
 from src.models.gamification import CakePersonality, UserInteraction
 from src.routes.auth import token_required
-from src.services.ai_service import ai_service
+from src.utils import json_response, success_response, now_iso
+from src.services.ai_service import ai_service, run_async
 from src.config.ai_config import SubjectMatter, ai_config_manager
 
+logger = logging.getLogger(__name__)
+
 cake_bp = Blueprint('cake', __name__)
 
-def run_async(coro):
-    """Helper to run async functions in Flask routes"""
+# Map category to SubjectMatter
+_SUBJECT_MAPPING = {
+    'task_created': SubjectMatter.TASK_CREATION,
+    'task_completed': SubjectMatter.TASK_COMPLETION,
+    'task_overdue': SubjectMatter.MOTIVATION,
+    'streak_milestone': SubjectMatter.CELEBRATION,
+    'level_up': SubjectMatter.CELEBRATION,
+    'encouragement': SubjectMatter.ENCOURAGEMENT,
+    'motivation': SubjectMatter.MOTIVATION,
+    'productivity_tips': SubjectMatter.PRODUCTIVITY_TIPS
+}
+
+_MOOD_ANIMATIONS = {
+    'cheerful': 'bounce',
+    'encouraging': 'glow',
+    'excited': 'celebration_bounce',
+    'celebratory': 'confetti_explosion',
+    'gentle': 'gentle_sway',
+    'motivating': 'pulse',
+    'supportive': 'warm_glow'
+}
+
+# Map celebration types to categories
+_CELEBRATION_MAPPING = {
+    'general': 'encouragement',
+    'milestone': 'streak_milestone',
+    'achievement': 'level_up'
+}
+
+# Pre-serialized envelopes for the hottest success responses
+_personality_retrieved = success_response('Birthday Cake AI personality retrieved')
+_interaction_recorded = success_response('Interaction recorded successfully')
+_celebration_triggered = success_response('Celebration triggered')
+
+_MOOD_CHOICES = ('cheerful', 'encouraging', 'excited', 'gentle')
+_VALID_MOODS = frozenset(_MOOD_CHOICES)
+_INVALID_MOOD_MESSAGE = f'Mood must be one of: {", ".join(_MOOD_CHOICES)}'
+
+# Interaction rows and mood updates are written behind the request by one
+# background thread, in batches of up to WRITE_BATCH_SIZE or every WRITE_FLUSH_SECONDS
+WRITE_BATCH_SIZE = 200
+WRITE_FLUSH_SECONDS = 0.05
+# Upper bound (seconds) process exit waits for queued rows to be written
+WRITE_SHUTDOWN_TIMEOUT = 10
+_write_queue = queue.Queue(maxsize=10_000)
+# Queued by the exit hook; the writer flushes what it holds and stops
+_STOP = object()
+_writer = None
+_writer_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def _interaction_insert():
+    # Core insert; these rows are never loaded back into the session
+    return UserInteraction.__table__.insert()
+
+@functools.lru_cache(maxsize=None)
+def _cake_mood_update():
+    # Only applies if the stored mood is still the one the request saw, so a
+    # late queued write can't clobber a newer synchronous mood change
+    users = User.__table__
+    return users.update().where(
+        users.c.id == bindparam('b_id'),
+        users.c.cake_mood.is_not_distinct_from(bindparam('b_previous'))
+    ).values(cake_mood=bindparam('b_mood'))
+
+def _flush_rows(rows):
+    """Apply queued (statement, params) rows, one executemany per consecutive run"""
+    start = 0
+    while start < len(rows):
+        statement = rows[start][0]
+        end = start + 1
+        while end < len(rows) and rows[end][0] is statement:
+            end += 1
+        db.session.execute(statement, [params for _, params in rows[start:end]])
+        start = end
+    db.session.commit()
+
+def _write_batch(batch):
+    """Write a batch, retrying row by row if it fails so one bad row drops alone"""
     try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        _flush_rows(batch)
+        return
+    except Exception as e:
+        db.session.rollback()
+        if len(batch) == 1:
+            logger.error(f"Dropping queued cake row: {e}")
+            return
+        logger.warning(f"Batch of {len(batch)} queued cake rows failed, retrying row by row: {e}")
     
-    return loop.run_until_complete(coro)
+    for row in batch:
+        try:
+            _flush_rows([row])
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Dropping queued cake row: {e}")
+
+def _write_behind(app):
+    """Drain queued rows into the database in batched statements"""
+    while True:
+        batch = []
+        item = _write_queue.get()
+        deadline = time.monotonic() + WRITE_FLUSH_SECONDS
+        while item is not _STOP:
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= WRITE_BATCH_SIZE or remaining <= 0:
+                break
+            try:
+                item = _write_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        
+        if batch:
+            with app.app_context():
+                try:
+                    _write_batch(batch)
+                finally:
+                    db.session.remove()
+        if item is _STOP:
+            return
 
-def get_cake_response_ai(category, user_mood='cheerful', user_level=1, context=None):
+def _stop_writer(writer):
+    """Let the writer flush rows still queued before the process exits"""
+    try:
+        _write_queue.put(_STOP, timeout=WRITE_SHUTDOWN_TIMEOUT)
+    except queue.Full:
+        logger.error("Cake write-behind queue still full at exit; queued rows may be lost")
+        return
+    writer.join(WRITE_SHUTDOWN_TIMEOUT)
+
+def _write_overflow(statement, params):
+    """Write a row the queue had no room for in its own transaction
+    
+    Uses a separate connection so the caller's session, and whatever the
+    view has pending in it, is neither committed nor rolled back.
+    """
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(statement, [params])
+    except Exception as e:
+        logger.error(f"Dropping cake row that overflowed the write queue: {e}")
+
+def _queue_write(statement, params):
+    """Queue a row for the writer thread, writing it inline if the queue is full"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(
+                    target=_write_behind, args=(current_app._get_current_object(),),
+                    name='cake-write-behind', daemon=True
+                )
+                _writer.start()
+                atexit.register(_stop_writer, _writer)
+    
+    try:
+        _write_queue.put_nowait((statement, params))
+    except queue.Full:
+        _write_overflow(statement, params)
+
+def record_interaction(**values):
+    """Queue a UserInteraction row"""
+    values.setdefault('created_at', datetime.utcnow())
+    _queue_write(_interaction_insert(), values)
+
+def record_cake_mood(user_id, mood, previous_mood):
+    """Queue an update of a user's stored cake mood, if it is still previous_mood"""
+    _queue_write(_cake_mood_update(), {'b_id': user_id, 'b_mood': mood, 'b_previous': previous_mood})
+
+# Recent AI responses for generic (category, mood, level) requests, so
+# repeated greetings and celebrations skip the provider round-trip
+RESPONSE_CACHE_TTL = 300
+RESPONSE_CACHE_MAX = 1024
+_CACHEABLE_CONTEXT_KEYS = frozenset(('context_type', 'celebration_type'))
+_CACHEABLE_SOURCES = frozenset(('ai', 'cache'))
+_response_cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+def _response_cache_key(category, user_mood, user_level, context):
+    """Cache key for a generic request, or None if the context is request-specific"""
+    if not _CACHEABLE_CONTEXT_KEYS.issuperset(context):
+        return None
+    try:
+        key = (category, user_mood, user_level,
+               context.get('context_type', 'general'), context.get('celebration_type'))
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def get_cake_response_ai(category, user_mood='cheerful', user_level=1, context=None, no_cache=False):
     """Get Birthday Cake AI response using the new AI service"""
     context = context or {}
+    key = None if no_cache else _response_cache_key(category, user_mood, user_level, context)
+    if key is not None:
+        now = time.monotonic()
+        with _response_cache_lock:
+            cached = _response_cache.get(key)
+            if cached is not None and cached[1] > now:
+                _response_cache.move_to_end(key)
+                return dict(cached[0])
     
-    # Map category to SubjectMatter
-    subject_mapping = {
-        'task_created': SubjectMatter.TASK_CREATION,
-        'task_completed': SubjectMatter.TASK_COMPLETION,
-        'task_overdue': SubjectMatter.MOTIVATION,
-        'streak_milestone': SubjectMatter.CELEBRATION,
-        'level_up': SubjectMatter.CELEBRATION,
-        'encouragement': SubjectMatter.ENCOURAGEMENT,
-        'motivation': SubjectMatter.MOTIVATION,
-        'productivity_tips': SubjectMatter.PRODUCTIVITY_TIPS
-    }
+    try:
+        response = run_async(get_cake_response_ai_async(category, user_mood, user_level, context))
+    except Exception:
+        # Timeouts or loop failures fall back like AI service errors do
+        return get_cake_response_static(category, user_mood, user_level)
+    
+    # Only real AI output is cached; canned and static fallbacks are not, so
+    # the AI is retried on the next call
+    if key is not None and response['source'] in _CACHEABLE_SOURCES:
+        with _response_cache_lock:
+            _response_cache[key] = (response, time.monotonic() + RESPONSE_CACHE_TTL)
+            _response_cache.move_to_end(key)
+            while len(_response_cache) > RESPONSE_CACHE_MAX:
+                _response_cache.popitem(last=False)
+    return dict(response)
+
+async def get_cake_response_ai_async(category, user_mood='cheerful', user_level=1, context=None):
+    """Get Birthday Cake AI response, awaiting the AI service on the shared loop"""
+    context = context or {}
     
-    subject = subject_mapping.get(category, SubjectMatter.ENCOURAGEMENT)
+    subject = _SUBJECT_MAPPING.get(category, SubjectMatter.ENCOURAGEMENT)
     
     # Enhance context with user information
-    enhanced_context = {
-        **context,
-        'user_mood': user_mood,
-        'user_level': user_level,
-        'category': category,
-        'context_type': context.get('context_type', 'general')
-    }
+    enhanced_context = dict(context, user_mood=user_mood, user_level=user_level, category=category)
+    enhanced_context.setdefault('context_type', 'general')
     
     try:
         # Use AI service to generate response
-        ai_response = run_async(ai_service.generate_response(subject, enhanced_context))
+        ai_response = await ai_service.generate_response(subject, enhanced_context)
         
         return {
             'text': ai_response.text,
@@ -63,36 +264,39 @@ def get_cake_response_ai(category, user_mood='cheerful', user_level=1, context=N
         # Fallback to static responses if AI service fails
         return get_cake_response_static(category, user_mood, user_level)
 
+# Static fallback responses, flattened once per category across moods
+_CAKE_RESPONSES = {
+    'task_created': {
+        'cheerful': [
+            "🎂 Wonderful! A new task to celebrate! Let's make this one extra sweet! ✨",
+            "🍰 Oh my! Another delicious challenge awaits! I'm so excited to see you succeed! 🎉"
+        ]
+    },
+    'task_completed': {
+        'cheerful': [
+            "🎂 Sweet success! You've earned another slice of productivity! Time to celebrate! 🍰",
+            "🎉 Magnificent! That task is now perfectly baked and ready to enjoy! Well done! ✨"
+        ]
+    },
+    'encouragement': {
+        'supportive': [
+            "🎂 Remember, every expert baker started with their first cupcake! You're doing great! 💪",
+            "🍰 Productivity is like baking - it takes time, patience, and lots of love! 💕"
+        ]
+    }
+}
+_FLAT_RESPONSES = {
+    category: tuple(text for mood_responses in moods.values() for text in mood_responses)
+    for category, moods in _CAKE_RESPONSES.items()
+}
+_choice = random.Random().choice
+
 def get_cake_response_static(category, user_mood='cheerful', user_level=1):
     """Fallback to static responses"""
-    CAKE_RESPONSES = {
-        'task_created': {
-            'cheerful': [
-                "🎂 Wonderful! A new task to celebrate! Let's make this one extra sweet! ✨",
-                "🍰 Oh my! Another delicious challenge awaits! I'm so excited to see you succeed! 🎉"
-            ]
-        },
-        'task_completed': {
-            'cheerful': [
-                "🎂 Sweet success! You've earned another slice of productivity! Time to celebrate! 🍰",
-                "🎉 Magnificent! That task is now perfectly baked and ready to enjoy! Well done! ✨"
-            ]
-        },
-        'encouragement': {
-            'supportive': [
-                "🎂 Remember, every expert baker started with their first cupcake! You're doing great! 💪",
-                "🍰 Productivity is like baking - it takes time, patience, and lots of love! 💕"
-            ]
-        }
-    }
-    
-    # Simple fallback logic
-    category_responses = CAKE_RESPONSES.get(category, CAKE_RESPONSES['encouragement'])
-    mood_responses = list(category_responses.values())[0]
-    response_text = random.choice(mood_responses)
+    responses = _FLAT_RESPONSES.get(category) or _FLAT_RESPONSES['encouragement']
     
     return {
-        'text': response_text,
+        'text': _choice(responses),
         'mood': user_mood,
         'animation': 'bounce',
         'category': category,
@@ -101,16 +305,7 @@ def get_cake_response_static(category, user_mood='cheerful', user_level=1):
 
 def get_animation_for_mood(mood):
     """Get animation type based on mood"""
-    animations = {
-        'cheerful': 'bounce',
-        'encouraging': 'glow',
-        'excited': 'celebration_bounce',
-        'celebratory': 'confetti_explosion',
-        'gentle': 'gentle_sway',
-        'motivating': 'pulse',
-        'supportive': 'warm_glow'
-    }
-    return animations.get(mood, 'bounce')
+    return _MOOD_ANIMATIONS.get(mood, 'bounce')
 
 @cake_bp.route('/cake/personality', methods=['GET'])
 @token_required
@@ -131,10 +326,9 @@ def get_cake_personality(current_user):
         else:
             current_mood = 'gentle'
         
-        # Update user's cake mood if it's different
+        # Persist the mood behind the request if it's different
         if current_user.cake_mood != current_mood:
-            current_user.cake_mood = current_mood
-            db.session.commit()
+            record_cake_mood(current_user.id, current_mood, current_user.cake_mood)
         
         # Get greeting using AI service
         greeting_context = {
@@ -154,22 +348,17 @@ def get_cake_personality(current_user):
             'greeting': greeting
         }
         
-        return jsonify({
-            'success': True,
-            'message': 'Birthday Cake AI personality retrieved',
-            'data': {
-                'personality': personality_state
-            },
-            'errors': []
-        }), 200
+        return _personality_retrieved({
+            'personality': personality_state
+        })
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to get cake personality',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @cake_bp.route('/cake/interact', methods=['POST'])
 @token_required
@@ -182,67 +371,63 @@ def interact_with_cake(current_user):
         context_data = data.get('context_data', {})
         
         if not interaction_type:
-            return jsonify({
+            return json_response({
                 'success': False,
                 'message': 'Interaction type is required',
                 'data': None,
                 'errors': [{'field': 'interaction_type', 'message': 'Interaction type is required'}]
-            }), 422
-        
-        # Get appropriate response using AI service
-        cake_response = get_cake_response_ai(
-            interaction_type, 
-            current_user.cake_mood, 
-            current_user.cake_personality_level,
-            context_data
-        )
+            }, 422)
         
         # Calculate rewards based on interaction type
         rewards = calculate_interaction_rewards(interaction_type, context_data, current_user)
         
         # Apply rewards
         if rewards['celebration_points'] > 0:
-            level_up = current_user.add_celebration_points(rewards['celebration_points'])
-            rewards['level_up'] = level_up
-            
-            # Special response for level up
-            if level_up:
-                cake_response = get_cake_response_ai('level_up', 'excited', current_user.cake_personality_level)
+            rewards['level_up'] = current_user.add_celebration_points(rewards['celebration_points'])
+        
+        # Get appropriate response using AI service; a level up gets its own
+        # special response, so only one AI call is made either way
+        if rewards['level_up']:
+            cake_response = get_cake_response_ai('level_up', 'excited', current_user.cake_personality_level)
+        else:
+            cake_response = get_cake_response_ai(
+                interaction_type, 
+                current_user.cake_mood, 
+                current_user.cake_personality_level,
+                context_data,
+                no_cache=True
+            )
+        
+        # Persist reward changes; the interaction itself is written behind
+        if rewards['celebration_points'] > 0:
+            db.session.commit()
         
         # Record the interaction
-        interaction = UserInteraction(
+        record_interaction(
             user_id=current_user.id,
             interaction_type=interaction_type,
             context_data=context_data,
             user_reaction=data.get('user_reaction')
         )
         
-        db.session.add(interaction)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': 'Interaction recorded successfully',
-            'data': {
-                'response': cake_response,
-                'rewards': rewards,
-                'personality_update': {
-                    'mood': current_user.cake_mood,
-                    'level': current_user.cake_personality_level,
-                    'total_points': current_user.total_celebration_points
-                }
-            },
-            'errors': []
-        }), 200
+        return _interaction_recorded({
+            'response': cake_response,
+            'rewards': rewards,
+            'personality_update': {
+                'mood': current_user.cake_mood,
+                'level': current_user.cake_personality_level,
+                'total_points': current_user.total_celebration_points
+            }
+        })
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to process interaction',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 def calculate_interaction_rewards(interaction_type, context_data, user):
     """Calculate rewards for different interaction types"""
@@ -280,19 +465,19 @@ def get_ai_config(current_user):
     """Get AI configuration status"""
     try:
         status = ai_service.get_service_status()
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'AI configuration retrieved',
             'data': status,
             'errors': []
-        }), 200
+        })
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to get AI configuration',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @cake_bp.route('/cake/config/test', methods=['POST'])
 @token_required
@@ -300,22 +485,22 @@ def test_ai_connectivity(current_user):
     """Test AI provider connectivity"""
     try:
         results = run_async(ai_service.test_connectivity())
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'Connectivity test completed',
             'data': {
                 'connectivity_results': results,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': now_iso()
             },
             'errors': []
-        }), 200
+        })
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Connectivity test failed',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @cake_bp.route('/cake/config/sync', methods=['POST'])
 @token_required
@@ -325,24 +510,24 @@ def sync_ai_responses(current_user):
         data = request.get_json() or {}
         force_sync = data.get('force', False)
         
-        results = run_async(ai_service.sync_with_ai(force=force_sync))
+        results = run_async(ai_service.sync_with_ai(force=force_sync), timeout=None)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'AI sync completed',
             'data': {
                 'sync_results': results,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': now_iso()
             },
             'errors': []
-        }), 200
+        })
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'AI sync failed',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @cake_bp.route('/cake/mood', methods=['PUT'])
 @token_required
@@ -354,36 +539,38 @@ def update_cake_mood(current_user):
         new_mood = data.get('mood')
         sweetness_level = data.get('sweetness_level')
         
-        valid_moods = ['cheerful', 'encouraging', 'excited', 'gentle']
-        
-        if new_mood and new_mood not in valid_moods:
-            return jsonify({
+        if new_mood and new_mood not in _VALID_MOODS:
+            return json_response({
                 'success': False,
                 'message': 'Invalid mood',
                 'data': None,
-                'errors': [{'field': 'mood', 'message': f'Mood must be one of: {", ".join(valid_moods)}'}]
-            }), 422
+                'errors': [{'field': 'mood', 'message': _INVALID_MOOD_MESSAGE}]
+            }, 422)
         
         if sweetness_level and (sweetness_level < 1 or sweetness_level > 5):
-            return jsonify({
+            return json_response({
                 'success': False,
                 'message': 'Invalid sweetness level',
                 'data': None,
                 'errors': [{'field': 'sweetness_level', 'message': 'Sweetness level must be between 1 and 5'}]
-            }), 422
+            }, 422)
         
-        # Update user preferences
-        if new_mood:
+        # Update user preferences, committing only if something changed
+        dirty = False
+        if new_mood and new_mood != current_user.cake_mood:
             current_user.cake_mood = new_mood
-        if sweetness_level:
+            dirty = True
+        if sweetness_level and sweetness_level != current_user.cake_sweetness_level:
             current_user.cake_sweetness_level = sweetness_level
+            dirty = True
         
-        db.session.commit()
+        if dirty:
+            db.session.commit()
         
         # Get updated personality response using AI service
         updated_response = get_cake_response_ai('encouragement', current_user.cake_mood, current_user.cake_personality_level)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'Cake personality updated successfully',
             'data': {
@@ -394,16 +581,16 @@ def update_cake_mood(current_user):
                 }
             },
             'errors': []
-        }), 200
+        })
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to update cake personality',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
 @cake_bp.route('/cake/celebrate', methods=['POST'])
 @token_required
@@ -413,14 +600,7 @@ def trigger_celebration(current_user):
         data = request.get_json()
         celebration_type = data.get('type', 'general')
         
-        # Map celebration types to categories
-        celebration_mapping = {
-            'general': 'encouragement',
-            'milestone': 'streak_milestone',
-            'achievement': 'level_up'
-        }
-        
-        category = celebration_mapping.get(celebration_type, 'encouragement')
+        category = _CELEBRATION_MAPPING.get(celebration_type, 'encouragement')
         context = {
             'context_type': 'celebration',
             'celebration_type': celebration_type
@@ -428,22 +608,17 @@ def trigger_celebration(current_user):
         
         response = get_cake_response_ai(category, 'excited', current_user.cake_personality_level, context)
         
-        return jsonify({
-            'success': True,
-            'message': 'Celebration triggered',
-            'data': {
-                'celebration': response,
-                'confetti': True,
-                'special_animation': 'party_mode'
-            },
-            'errors': []
-        }), 200
+        return _celebration_triggered({
+            'celebration': response,
+            'confetti': True,
+            'special_animation': 'party_mode'
+        })
         
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'message': 'Failed to trigger celebration',
             'data': None,
             'errors': [{'message': str(e)}]
-        }), 500
+        }, 500)
 
@@ -5,15 +5,24 @@ Provides shared fixtures, utilities, and test setup/teardown
 
 import pytest
 import asyncio
+import copy
+import functools
 import os
+import re
 import sys
 import json
 import tempfile
 import shutil
 from datetime import datetime, timedelta
-from typing import Dict, Any, Generator, Optional
+from types import SimpleNamespace
+from typing import Dict, Any, Generator, Optional, TYPE_CHECKING
 from unittest.mock import Mock, patch
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Add project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, os.path.join(project_root, 'cake-backend', 'src'))
@@ -24,34 +33,11 @@ from tests.config.test_config import (
     TEST_USERS, TEST_TASKS, AI_TEST_RESPONSES
 )
 
-# Import application modules
-try:
-    from main import app, db
-    from models.user import User
-    from models.task import Task
-    from models.gamification import CakePersonality, Achievement
-    from services.ai_service import ai_service
-    from config.ai_config import ai_config_manager
-except ImportError as e:
-    print(f"Warning: Could not import application modules: {e}")
-    app = None
-    db = None
-
-# Playwright imports
-try:
-    from playwright.sync_api import Browser, BrowserContext, Page
-    from playwright.async_api import async_playwright
-except ImportError:
-    print("Warning: Playwright not installed. UI tests will be skipped.")
-
-# Testing utilities
-import requests
-import factory
-from faker import Faker
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-fake = Faker()
+# Heavy optional dependencies (the Flask app, Playwright, Faker, factory_boy,
+# requests, psutil) are imported inside the fixtures that use them, so
+# collecting unit tests doesn't pay for them
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
 
 # ============================================================================
 # Session-scoped fixtures
@@ -69,6 +55,23 @@ def test_config_fixture():
     """Provide test configuration for the session."""
     return test_config
 
+@pytest.fixture(scope="session")
+def app_modules():
+    """Import the Flask application and models once per session."""
+    try:
+        from main import app, db
+        from models.user import User
+        from models.task import Task
+    except ImportError as e:
+        pytest.skip(f"Could not import application modules: {e}")
+    
+    return SimpleNamespace(app=app, db=db, User=User, Task=Task)
+
+@pytest.fixture(scope="session")
+def fake():
+    """Provide a shared Faker instance."""
+    return pytest.importorskip("faker").Faker()
+
 @pytest.fixture(scope="session")
 def temp_dir():
     """Create a temporary directory for test files."""
@@ -81,10 +84,9 @@ def temp_dir():
 # ============================================================================
 
 @pytest.fixture(scope="session")
-def test_database():
+def test_database(app_modules):
     """Create and configure test database."""
-    if not db:
-        pytest.skip("Database not available")
+    app, db = app_modules.app, app_modules.db
     
     # Create test database
     test_db_path = os.path.join(tempfile.gettempdir(), "test_birthday_cake.db")
@@ -105,9 +107,9 @@ def test_database():
         os.unlink(test_db_path)
 
 @pytest.fixture
-def db_session(test_database):
+def db_session(app_modules, test_database):
     """Provide a database session for tests."""
-    with app.app_context():
+    with app_modules.app.app_context():
         connection = test_database.engine.connect()
         transaction = connection.begin()
         
@@ -126,10 +128,9 @@ def db_session(test_database):
 # ============================================================================
 
 @pytest.fixture
-def flask_app():
+def flask_app(app_modules):
     """Provide Flask application for testing."""
-    if not app:
-        pytest.skip("Flask app not available")
+    app = app_modules.app
     
     app.config['TESTING'] = True
     app.config['WTF_CSRF_ENABLED'] = False
@@ -145,6 +146,8 @@ def client(flask_app):
 @pytest.fixture
 def api_client():
     """Provide API client for testing."""
+    requests = pytest.importorskip("requests")
+    
     class APIClient:
         def __init__(self, base_url: str = None):
             self.base_url = base_url or test_config.api.base_url
@@ -180,7 +183,7 @@ def api_client():
 # ============================================================================
 
 @pytest.fixture
-def test_user_data():
+def test_user_data(fake):
     """Provide test user data."""
     return {
         "username": fake.user_name(),
@@ -191,9 +194,9 @@ def test_user_data():
     }
 
 @pytest.fixture
-def test_user(db_session, test_user_data):
+def test_user(app_modules, db_session, test_user_data):
     """Create a test user in the database."""
-    user = User(
+    user = app_modules.User(
         username=test_user_data["username"],
         email=test_user_data["email"],
         cake_mood=test_user_data["cake_mood"],
@@ -235,7 +238,7 @@ def authenticated_user(api_client, test_user_data):
 # ============================================================================
 
 @pytest.fixture
-def test_task_data():
+def test_task_data(fake):
     """Provide test task data."""
     return {
         "title": fake.sentence(nb_words=4),
@@ -247,9 +250,9 @@ def test_task_data():
     }
 
 @pytest.fixture
-def test_task(db_session, test_user, test_task_data):
+def test_task(app_modules, db_session, test_user, test_task_data):
     """Create a test task in the database."""
-    task = Task(
+    task = app_modules.Task(
         title=test_task_data["title"],
         description=test_task_data["description"],
         priority=test_task_data["priority"],
@@ -335,7 +338,7 @@ def browser_context_args():
     }
 
 @pytest.fixture
-def page_with_auth(page: Page, authenticated_user):
+def page_with_auth(page: "Page", authenticated_user):
     """Provide a page with authenticated user."""
     # Navigate to login page and authenticate
     page.goto(f"{test_config.api.base_url}/login")
@@ -357,7 +360,7 @@ def page_with_auth(page: Page, authenticated_user):
 @pytest.fixture
 def performance_monitor():
     """Monitor performance metrics during tests."""
-    import psutil
+    psutil = pytest.importorskip("psutil")
     import time
     
     class PerformanceMonitor:
@@ -389,62 +392,93 @@ def performance_monitor():
 # Test data factories
 # ============================================================================
 
-class UserFactory(factory.Factory):
-    """Factory for creating test users."""
-    class Meta:
-        model = dict
+@pytest.fixture(scope="session")
+def factories(fake):
+    """Build the factory_boy test data factories once per session.
     
-    username = factory.Faker('user_name')
-    email = factory.Faker('email')
-    password = "TestPassword123!"
-    cake_mood = factory.Faker('random_element', elements=['cheerful', 'encouraging', 'excited'])
-    cake_sweetness_level = factory.Faker('random_int', min=1, max=5)
-
-class TaskFactory(factory.Factory):
-    """Factory for creating test tasks."""
-    class Meta:
-        model = dict
+    Fields call the shared Faker instance directly rather than going through
+    factory.Faker, which resolves the provider on every build.
+    """
+    factory = pytest.importorskip("factory")
+    
+    class UserFactory(factory.Factory):
+        """Factory for creating test users."""
+        class Meta:
+            model = dict
+        
+        username = factory.LazyFunction(fake.user_name)
+        email = factory.LazyFunction(fake.email)
+        password = "TestPassword123!"
+        cake_mood = factory.LazyFunction(lambda: fake.random_element(('cheerful', 'encouraging', 'excited')))
+        cake_sweetness_level = factory.LazyFunction(lambda: fake.random_int(min=1, max=5))
     
-    title = factory.Faker('sentence', nb_words=4)
-    description = factory.Faker('text', max_nb_chars=200)
-    priority = factory.Faker('random_int', min=1, max=5)
-    difficulty = factory.Faker('random_int', min=1, max=5)
-    estimated_duration = factory.Faker('random_int', min=15, max=240)
+    class TaskFactory(factory.Factory):
+        """Factory for creating test tasks."""
+        class Meta:
+            model = dict
+        
+        title = factory.LazyFunction(lambda: fake.sentence(nb_words=4))
+        description = factory.LazyFunction(lambda: fake.text(max_nb_chars=200))
+        priority = factory.LazyFunction(lambda: fake.random_int(min=1, max=5))
+        difficulty = factory.LazyFunction(lambda: fake.random_int(min=1, max=5))
+        estimated_duration = factory.LazyFunction(lambda: fake.random_int(min=15, max=240))
+    
+    return SimpleNamespace(user=UserFactory, task=TaskFactory)
 
 @pytest.fixture
-def user_factory():
+def user_factory(factories):
     """Provide user factory."""
-    return UserFactory
+    return factories.user
 
 @pytest.fixture
-def task_factory():
+def task_factory(factories):
     """Provide task factory."""
-    return TaskFactory
+    return factories.task
 
 # ============================================================================
 # Utility fixtures
 # ============================================================================
 
-@pytest.fixture
+@functools.lru_cache(maxsize=None)
+def _read_test_data(filepath: str) -> Dict[str, Any]:
+    """Parse a JSON test data file once per session."""
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+@pytest.fixture(scope="session")
 def test_data_loader():
-    """Load test data from JSON files."""
-    def load_test_data(filename: str) -> Dict[str, Any]:
-        filepath = os.path.join(test_config.get_test_data_dir(), filename)
-        with open(filepath, 'r') as f:
-            return json.load(f)
+    """Load test data from JSON files.
+    
+    Parsed files are shared across tests; pass ``mutable=True`` to get a
+    private copy that is safe to modify.
+    """
+    def load_test_data(filename: str, mutable: bool = False) -> Dict[str, Any]:
+        data = _read_test_data(os.path.join(test_config.get_test_data_dir(), filename))
+        return copy.deepcopy(data) if mutable else data
     
     return load_test_data
 
+def _screenshot_filename(node, name: str) -> str:
+    """Unique screenshot file name within a test.
+    
+    The timestamp is formatted once per test; a per-test counter keeps
+    repeated names taken in the same test from overwriting each other.
+    """
+    timestamp = getattr(node, "_screenshot_timestamp", None)
+    if timestamp is None:
+        timestamp = node._screenshot_timestamp = f"{datetime.now():%Y%m%d_%H%M%S}"
+        node._screenshot_count = 0
+    node._screenshot_count += 1
+    return f"{name}_{timestamp}_{node._screenshot_count}.png"
+
 @pytest.fixture
-def screenshot_helper():
+def screenshot_helper(request):
     """Helper for taking screenshots during tests."""
-    def take_screenshot(page: Page, name: str):
+    def take_screenshot(page: "Page", name: str):
         screenshot_dir = os.path.join(test_config.get_reports_dir(), "screenshots")
-        os.makedirs(screenshot_dir, exist_ok=True)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{name}_{timestamp}.png"
-        filepath = os.path.join(screenshot_dir, filename)
+        filepath = os.path.join(screenshot_dir, _screenshot_filename(request.node, name))
         
         page.screenshot(path=filepath)
         return filepath
@@ -456,6 +490,12 @@ def validation_helper():
     """Helper for validation testing."""
     from tests.config.test_config import VALIDATION_RULES
     
+    compiled_patterns = {
+        name: re.compile(rules['pattern'])
+        for name, rules in VALIDATION_RULES.items()
+        if 'pattern' in rules
+    }
+    
     class ValidationHelper:
         @staticmethod
         def validate_field(field_name: str, value: Any) -> Dict[str, Any]:
@@ -463,32 +503,41 @@ def validation_helper():
             rules = VALIDATION_RULES.get(field_name, {})
             errors = []
             
-            if rules.get('required', False) and not value:
+            if not value and rules.get('required', False):
                 errors.append(f"{field_name} is required")
             
             if isinstance(value, str):
-                if 'min_length' in rules and len(value) < rules['min_length']:
-                    errors.append(f"{field_name} must be at least {rules['min_length']} characters")
+                min_length = rules.get('min_length')
+                if min_length is not None and len(value) < min_length:
+                    errors.append(f"{field_name} must be at least {min_length} characters")
                 
-                if 'max_length' in rules and len(value) > rules['max_length']:
-                    errors.append(f"{field_name} must be at most {rules['max_length']} characters")
+                max_length = rules.get('max_length')
+                if max_length is not None and len(value) > max_length:
+                    errors.append(f"{field_name} must be at most {max_length} characters")
                 
-                if 'pattern' in rules:
-                    import re
-                    if not re.match(rules['pattern'], value):
-                        errors.append(f"{field_name} format is invalid")
+                pattern = compiled_patterns.get(field_name)
+                if pattern is not None and not pattern.match(value):
+                    errors.append(f"{field_name} format is invalid")
             
-            if isinstance(value, (int, float)):
-                if 'min_value' in rules and value < rules['min_value']:
-                    errors.append(f"{field_name} must be at least {rules['min_value']}")
+            elif isinstance(value, (int, float)):
+                min_value = rules.get('min_value')
+                if min_value is not None and value < min_value:
+                    errors.append(f"{field_name} must be at least {min_value}")
                 
-                if 'max_value' in rules and value > rules['max_value']:
-                    errors.append(f"{field_name} must be at most {rules['max_value']}")
+                max_value = rules.get('max_value')
+                if max_value is not None and value > max_value:
+                    errors.append(f"{field_name} must be at most {max_value}")
             
             return {
                 "valid": len(errors) == 0,
                 "errors": errors
             }
+        
+        @classmethod
+        def validate_batch(cls, values: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+            """Validate several fields at once, keyed by field name."""
+            validate_field = cls.validate_field
+            return {field_name: validate_field(field_name, value) for field_name, value in values.items()}
     
     return ValidationHelper()
 
@@ -498,12 +547,10 @@ def validation_helper():
 
 def pytest_configure(config):
     """Configure pytest with custom settings."""
-    # Create reports directory
+    # Create the reports directory tree once; screenshot paths rely on it
     reports_dir = test_config.get_reports_dir()
-    os.makedirs(reports_dir, exist_ok=True)
-    os.makedirs(os.path.join(reports_dir, "screenshots"), exist_ok=True)
-    os.makedirs(os.path.join(reports_dir, "videos"), exist_ok=True)
-    os.makedirs(os.path.join(reports_dir, "traces"), exist_ok=True)
+    for subdir in ("screenshots", "videos", "traces"):
+        os.makedirs(os.path.join(reports_dir, subdir), exist_ok=True)
 
 def pytest_runtest_makereport(item, call):
     """Generate test reports with additional information."""
@@ -512,28 +559,23 @@ def pytest_runtest_makereport(item, call):
         if call.when == "call" and call.excinfo is not None:
             # Take screenshot on failure
             screenshot_dir = os.path.join(test_config.get_reports_dir(), "screenshots")
-            os.makedirs(screenshot_dir, exist_ok=True)
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            screenshot_path = os.path.join(screenshot_dir, f"{item.name}_{timestamp}.png")
+            screenshot_path = os.path.join(screenshot_dir, _screenshot_filename(item, item.name))
             page.screenshot(path=screenshot_path)
 
 def pytest_html_report_title(report):
     """Customize HTML report title."""
     report.title = "Birthday Cake Planner - Comprehensive Test Report"
 
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session", autouse=True)
 def test_environment_setup():
-    """Set up test environment for each test."""
+    """Set up the test environment once for the session."""
     # Set test environment variables
-    os.environ['TESTING'] = 'true'
-    os.environ['FLASK_ENV'] = 'testing'
+    os.environ.update({'TESTING': 'true', 'FLASK_ENV': 'testing'})
     
     yield
     
-    # Clean up after test
-    if 'TESTING' in os.environ:
-        del os.environ['TESTING']
-    if 'FLASK_ENV' in os.environ:
-        del os.environ['FLASK_ENV']
+    # Clean up after the session
+    os.environ.pop('TESTING', None)
+    os.environ.pop('FLASK_ENV', None)
 
@@ -52,6 +52,10 @@ class UserAchievement(db.Model):
     
     # Relationships
     achievement = db.relationship('Achievement', backref='user_achievements')
+    
+    __table_args__ = (
+        db.Index('ix_user_achievement_user_achievement', 'user_id', 'achievement_id'),
+    )
 
     def __repr__(self):
         return f'<UserAchievement {self.user_id}:{self.achievement_id}>'
@@ -122,6 +126,10 @@ class UserInteraction(db.Model):
     # Timing
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     response_time = db.Column(db.Float)  # Time taken to respond in seconds
+    
+    __table_args__ = (
+        db.Index('ix_user_interaction_user_type', 'user_id', 'interaction_type'),
+    )
 
     def __repr__(self):
         return f'<UserInteraction {self.user_id}:{self.interaction_type}>'
@@ -157,6 +165,10 @@ class ProductivityStreak(db.Model):
     # Status
     is_active = db.Column(db.Boolean, default=True)
     broken_reason = db.Column(db.String(100))  # Why the streak was broken
+    
+    __table_args__ = (
+        db.Index('ix_productivity_streak_user_type_active', 'user_id', 'streak_type', 'is_active'),
+    )
 
     def __repr__(self):
         return f'<ProductivityStreak {self.user_id}:{self.streak_type}:{self.length}>'
@@ -4,21 +4,51 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
 from src.models.user import db
 from src.models.task import Task, TaskDependency
 from src.models.project import Project, ProjectMember
 from src.models.gamification import Achievement, UserAchievement, CarrotPersonality, UserInteraction, ProductivityStreak
 from src.models.team import Team, TeamMember, TeamInvitation
 from src.routes.user import user_bp
-from src.routes.auth import auth_bp
+from src.routes.auth import auth_bp, init_auth
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    class OrjsonProvider(DefaultJSONProvider):
+        """jsonify via orjson, keeping Flask's sorted keys and HTTP-date datetimes"""
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default, option=self.option).decode()
+        
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = 'carrot-planner-secret-key-2024'
+# Optional werkzeug hash method for new passwords, e.g. 'pbkdf2:sha256:100000'
+app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD')
+init_auth(app)
 
 # Enable CORS for all routes
 CORS(app, origins=['*'])
 
+# Compress large JSON responses; small payloads are sent as-is
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_LEVEL'] = 1
+app.config['COMPRESS_BR_LEVEL'] = 1
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+Compress(app)
+
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api')
 app.register_blueprint(user_bp, url_prefix='/api')
@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import inspect
 from src.models.user import db
 
 class Project(db.Model):
@@ -33,21 +34,30 @@ class Project(db.Model):
 
     def calculate_progress(self):
         """Calculate project progress based on completed tasks"""
-        if not self.tasks:
+        stats = self.get_task_stats()
+        if not stats['total']:
             return 0
         
-        total_tasks = len(self.tasks)
-        completed_tasks = len([task for task in self.tasks if task.status == 'completed'])
-        
-        self.progress = int((completed_tasks / total_tasks) * 100)
+        self.progress = int((stats['completed'] / stats['total']) * 100)
         return self.progress
 
     def get_task_stats(self):
         """Get comprehensive task statistics for the project"""
-        total_tasks = len(self.tasks)
-        completed_tasks = len([task for task in self.tasks if task.status == 'completed'])
-        in_progress_tasks = len([task for task in self.tasks if task.status == 'in_progress'])
-        overdue_tasks = len([task for task in self.tasks if task.is_overdue()])
+        # Aggregate in the database rather than loading every task just to count it
+        if self.id is not None and 'tasks' in inspect(self).unloaded:
+            return self._query_task_stats()
+        
+        # Single pass over the already-loaded tasks
+        total_tasks = completed_tasks = in_progress_tasks = overdue_tasks = 0
+        for task in self.tasks:
+            total_tasks += 1
+            status = task.status
+            if status == 'completed':
+                completed_tasks += 1
+            elif status == 'in_progress':
+                in_progress_tasks += 1
+            if task.is_overdue():
+                overdue_tasks += 1
         
         return {
             'total': total_tasks,
@@ -57,6 +67,38 @@ class Project(db.Model):
             'pending': total_tasks - completed_tasks - in_progress_tasks
         }
 
+    def _query_task_stats(self):
+        """Task statistics computed with GROUP BY/COUNT queries"""
+        from src.models.task import Task
+        
+        counts = dict(
+            db.session.query(Task.status, db.func.count(Task.id))
+            .filter(Task.project_id == self.id)
+            .group_by(Task.status)
+            .all()
+        )
+        # Same rule as Task.is_overdue: past due and not completed
+        overdue_tasks = (
+            db.session.query(db.func.count(Task.id))
+            .filter(
+                Task.project_id == self.id,
+                Task.due_date < datetime.utcnow(),
+                db.or_(Task.status.is_(None), Task.status != 'completed')
+            )
+            .scalar()
+        )
+        
+        total_tasks = sum(counts.values())
+        completed_tasks = counts.get('completed', 0)
+        in_progress_tasks = counts.get('in_progress', 0)
+        return {
+            'total': total_tasks,
+            'completed': completed_tasks,
+            'in_progress': in_progress_tasks,
+            'overdue': overdue_tasks,
+            'pending': total_tasks - completed_tasks - in_progress_tasks
+        }
+
     def is_overdue(self):
         """Check if project is overdue"""
         if self.end_date and self.status not in ['completed', 'cancelled']:
@@ -82,8 +124,14 @@ class Project(db.Model):
     def __repr__(self):
         return f'<Project {self.name}>'
 
-    def to_dict(self):
-        return {
+    def to_dict(self, *, include_stats=False, include_overdue=False, task_stats=None):
+        """Serialize the project
+        
+        Task statistics and the overdue flag are opt-in so list views don't
+        count every project's tasks; pass precomputed ``task_stats`` (e.g. from
+        one bulk GROUP BY) to include them without a per-project query.
+        """
+        data = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
@@ -100,10 +148,15 @@ class Project(db.Model):
             'budget': self.budget,
             'spent_budget': self.spent_budget,
             'owner_id': self.owner_id,
-            'team_id': self.team_id,
-            'is_overdue': self.is_overdue(),
-            'task_stats': self.get_task_stats()
+            'team_id': self.team_id
         }
+        if include_overdue:
+            data['is_overdue'] = self.is_overdue()
+        if task_stats is not None:
+            data['task_stats'] = task_stats
+        elif include_stats:
+            data['task_stats'] = self.get_task_stats()
+        return data
 
 
 class ProjectMember(db.Model):
@@ -113,6 +166,11 @@ class ProjectMember(db.Model):
     role = db.Column(db.String(20), default='member')  # owner, admin, member, viewer
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     permissions = db.Column(db.JSON, default={})
+    
+    # Backs add_member's existence check and enforces one membership per user
+    __table_args__ = (
+        db.Index('ix_project_member_project_user', 'project_id', 'user_id', unique=True),
+    )
 
     def __repr__(self):
         return f'<ProjectMember {self.user_id} in {self.project_id}>'
@@ -128,6 +128,102 @@ class TestBirthdayCakeAI:
         assert "celebrate" in cake_response['text'].lower()
         assert cake_response['mood'] == "celebratory"
         assert 'animation_type' in cake_response
+    
+    def test_write_behind_drains_queue_before_stopping(self, flask_app):
+        """Test that rows still queued at shutdown are written before the writer exits"""
+        import queue
+        import threading
+        from src.routes import cake
+        
+        written = []
+        with patch.object(cake, '_write_queue', queue.Queue()), \
+                patch.object(cake, '_write_batch', side_effect=written.extend):
+            for n in range(5):
+                cake._write_queue.put(("statement", {"n": n}))
+            
+            writer = threading.Thread(target=cake._write_behind, args=(flask_app,), daemon=True)
+            writer.start()
+            cake._stop_writer(writer)
+        
+        assert not writer.is_alive()
+        assert [params["n"] for _, params in written] == list(range(5))
+    
+    def test_write_behind_drops_only_bad_rows(self):
+        """Test that a failed batch is retried row by row so good rows still land"""
+        from src.routes import cake
+        
+        good_first, bad, good_last = ("statement", {"n": 1}), ("statement", {"n": 2}), ("statement", {"n": 3})
+        written = []
+        
+        def flush_rows(rows):
+            if bad in rows:
+                raise ValueError("constraint failed")
+            written.extend(rows)
+        
+        with patch.object(cake, '_flush_rows', side_effect=flush_rows), \
+                patch.object(cake.db, 'session') as mock_session:
+            cake._write_batch([good_first, bad, good_last])
+        
+        assert written == [good_first, good_last]
+        assert mock_session.rollback.call_count == 2
+    
+    def test_queued_mood_write_skips_changed_mood(self, db_session):
+        """Test that a queued mood write never overwrites a newer mood"""
+        from src.models.user import User
+        from src.routes import cake
+        
+        user = User(username="mooduser", email="mooduser@example.com", cake_mood="cheerful")
+        user.set_password("SecurePass123!")
+        db_session.add(user)
+        db_session.flush()
+        
+        # A mood update lands after the write was queued against "cheerful"
+        user.cake_mood = "excited"
+        db_session.flush()
+        
+        db_session.execute(cake._cake_mood_update(),
+                           [{'b_id': user.id, 'b_mood': "sleepy", 'b_previous': "cheerful"}])
+        db_session.refresh(user)
+        assert user.cake_mood == "excited"
+        
+        db_session.execute(cake._cake_mood_update(),
+                           [{'b_id': user.id, 'b_mood': "proud", 'b_previous': "excited"}])
+        db_session.refresh(user)
+        assert user.cake_mood == "proud"
+    
+    @pytest.mark.parametrize("text,expected", [
+        ("That was AMAZING, and calm too!", ("excited", "celebration_bounce")),
+        ("Let's CELEBRATE gently, nice and Soft", ("gentle", "gentle_sway")),
+        # Non-ASCII case folds of keywords are not keywords
+        ("ſoft and amazıng, AMAZİNG", ("cheerful", "bounce")),
+    ])
+    def test_response_mood_keywords(self, text, expected):
+        """Test that mood hints are parsed from keywords, ignoring Unicode case folds"""
+        from src.services.ai_service import OpenAIProvider
+        
+        provider = OpenAIProvider.__new__(OpenAIProvider)
+        assert provider._parse_response_metadata(text) == expected
+    
+    def test_write_queue_overflow_uses_own_transaction(self):
+        """Test that a row the full queue can't take never commits the request's session"""
+        import queue
+        from src.routes import cake
+        
+        full_queue = queue.Queue(maxsize=1)
+        full_queue.put(("statement", {"n": 0}))
+        with patch.object(cake, '_write_queue', full_queue), \
+                patch.object(cake, '_writer', Mock()), \
+                patch.object(cake, 'db') as mock_db:
+            connection = mock_db.engine.begin.return_value.__enter__.return_value
+            cake._queue_write("statement", {"n": 1})
+            connection.execute.assert_called_once_with("statement", [{"n": 1}])
+            
+            # A failing overflow row is logged and dropped, not raised into the view
+            connection.execute.side_effect = ValueError("constraint failed")
+            cake._queue_write("statement", {"n": 2})
+        
+        mock_db.session.commit.assert_not_called()
+        assert full_queue.qsize() == 1
 
 
 @pytest.mark.ai_personality
@@ -283,6 +379,95 @@ class TestAIFallbackMechanisms:
             # Both responses should be successful
             assert response1.status_code == 201
             assert response2.status_code == 201
+    
+    def test_probe_circuit_opens_after_failed_probes(self):
+        """Test that a provider whose probes keep failing is skipped until its cooldown ends"""
+        from src.config.ai_config import AIProvider
+        from src.services import ai_service as ai_service_module
+        from src.services.ai_service import ai_service
+        
+        provider = AIProvider.OPENAI
+        with patch.dict(ai_service._circuits, {provider: {'fail_count': 0, 'open_until': 0.0}}), \
+                patch.object(ai_service_module, 'PROBE_BACKOFF', 0), \
+                patch.object(ai_service.config_manager, 'check_connectivity',
+                             side_effect=ConnectionError("unreachable")) as mock_check:
+            result = asyncio.run(ai_service._probe_provider(provider))
+            assert result['status'] == 'error'
+            assert mock_check.call_count == ai_service_module.PROBE_ATTEMPTS
+            assert ai_service._circuits[provider]['fail_count'] == 1
+            
+            # While the circuit is open the provider is not probed at all
+            result = asyncio.run(ai_service._probe_provider(provider))
+            assert result['status'] == 'circuit_open'
+            assert mock_check.call_count == ai_service_module.PROBE_ATTEMPTS
+            
+            # Once the cooldown has passed, a successful probe closes the circuit
+            ai_service._circuits[provider]['open_until'] = 0.0
+            mock_check.side_effect = None
+            mock_check.return_value = True
+            result = asyncio.run(ai_service._probe_provider(provider))
+            assert result['status'] == 'connected'
+            assert ai_service._circuits[provider]['fail_count'] == 0
+    
+    def test_disconnected_probe_opens_circuit(self):
+        """Test that a clean "disconnected" answer opens the circuit without retrying"""
+        from src.config.ai_config import AIProvider
+        from src.services.ai_service import ai_service
+        
+        provider = AIProvider.OPENAI
+        with patch.dict(ai_service._circuits, {provider: {'fail_count': 0, 'open_until': 0.0}}), \
+                patch.object(ai_service.config_manager, 'check_connectivity', return_value=False) as mock_check:
+            assert asyncio.run(ai_service._probe_provider(provider))['status'] == 'disconnected'
+            assert mock_check.call_count == 1
+            assert ai_service._circuits[provider]['fail_count'] == 1
+            
+            assert asyncio.run(ai_service._probe_provider(provider))['status'] == 'circuit_open'
+            assert mock_check.call_count == 1
+    
+    def test_disconnected_result_cached_for_cooldown(self):
+        """Test that a failed connectivity check is reused for a fixed cooldown"""
+        from src.config import ai_config
+        from src.config.ai_config import ai_config_manager, AIProvider
+        
+        provider = AIProvider.OPENAI
+        index = provider.ordinal
+        cooldown = ai_config.CONNECTIVITY_RETRY_SECONDS
+        with patch.object(ai_config_manager, '_next_retry', list(ai_config_manager._next_retry)), \
+                patch.object(ai_config_manager, '_conn_status', list(ai_config_manager._conn_status)), \
+                patch.dict(ai_config_manager.last_sync_attempt), \
+                patch.dict(ai_config_manager._env, {'OPENAI_API_KEY': None, 'OPENAI_API_BASE': None}):
+            ai_config_manager._next_retry[index] = 0.0
+            assert ai_config_manager.check_connectivity(provider) is False
+            assert ai_config_manager._next_retry[index] - time.monotonic() == pytest.approx(cooldown, abs=5)
+            
+            # Within the cooldown the provider stays down without being re-checked
+            with patch.object(ai_config_manager, '_probe_connectivity') as mock_probe:
+                for _ in range(3):
+                    assert ai_config_manager.check_connectivity(provider) is False
+            mock_probe.assert_not_called()
+            
+            # Once it expires, a recovered provider is seen as connected again
+            ai_config_manager._env.update(OPENAI_API_KEY='test-key', OPENAI_API_BASE='https://api.example.com')
+            ai_config_manager._next_retry[index] = 0.0
+            assert ai_config_manager.check_connectivity(provider) is True
+            assert ai_config_manager._next_retry[index] - time.monotonic() == pytest.approx(cooldown, abs=5)
+    
+    def test_cake_response_falls_back_when_ai_loop_fails(self):
+        """Test that a timed-out or failed AI call yields a static cake response"""
+        from src.routes import cake
+        
+        def failing_run_async(coro, *args, **kwargs):
+            coro.close()
+            raise TimeoutError("AI request timed out")
+        
+        with patch.dict(cake._response_cache, clear=True), \
+                patch('src.routes.cake.run_async', side_effect=failing_run_async):
+            response = cake.get_cake_response_ai('encouragement', 'cheerful', 1)
+            assert not cake._response_cache
+        
+        assert response['source'] == 'static_fallback'
+        assert response['category'] == 'encouragement'
+        assert len(response['text']) > 0
 
 
 @pytest.mark.ai_personality
@@ -412,6 +597,82 @@ class TestAIConfiguration:
         task_completion_responses = fallback_data['task_completion']
         assert any(r['text'] == new_response['text'] for r in task_completion_responses)
 
+    
+    def test_batch_admin_requests(self, authenticated_user):
+        """Test combining several admin reads in one batch request"""
+        client = authenticated_user["client"]
+        
+        batch = {"requests": [{"op": "config"}, {"op": "connectivity"}, {"op": "fallbacks"}]}
+        response = client.post('/api/admin/ai/batch', json=batch)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data['success'] is True
+        
+        results = data['data']['responses']
+        assert [r['op'] for r in results] == ["config", "connectivity", "fallbacks"]
+        assert all(r['success'] for r in results)
+        assert 'subject_configurations' in results[0]['data']
+        assert 'connectivity_results' in results[1]['data']
+        assert 'fallback_responses' in results[2]['data']
+        
+        # Unknown operations are rejected before anything runs
+        invalid_response = client.post('/api/admin/ai/batch', json={"requests": [{"op": "drop_tables"}]})
+        assert invalid_response.status_code == 422
+    
+    @pytest.mark.parametrize("body", [
+        {"requests": ["config"]},
+        {"requests": [{"op": 1}]},
+        {"requests": {"op": "config"}},
+        {"requests": [{"op": "config"}] * 17},
+        ["config"],
+    ])
+    def test_batch_admin_requests_rejects_malformed_batches(self, authenticated_user, body):
+        """Test that malformed or oversized batches are rejected with 422, not 500"""
+        client = authenticated_user["client"]
+        
+        response = client.post('/api/admin/ai/batch', json=body)
+        
+        assert response.status_code == 422
+        assert response.json()['success'] is False
+    
+    def test_batch_admin_requests_repeated_ops(self, authenticated_user):
+        """Test that repeated operations each get a response with the same result"""
+        client = authenticated_user["client"]
+        
+        batch = {"requests": [{"op": "fallbacks"}, {"op": "config"}, {"op": "fallbacks"}]}
+        response = client.post('/api/admin/ai/batch', json=batch)
+        
+        assert response.status_code == 200
+        results = response.json()['data']['responses']
+        assert [r['op'] for r in results] == ["fallbacks", "config", "fallbacks"]
+        assert results[0]['data'] == results[2]['data']
+    
+    @pytest.mark.parametrize("template", [
+        "Task: {task_title} (priority {priority}) for {user_mood} user, again {task_title}",
+        "Level {user_level:03d} and {streak!r} with {{literal braces}}",
+        "Nested {task[title]} field",
+        "No fields at all",
+    ])
+    def test_compiled_context_template_matches_str_format(self, template):
+        """Test that compiled context templates render exactly like str.format"""
+        from src.config.ai_config import compile_context_template
+        
+        context = {"task_title": "Bake", "priority": 5, "user_mood": "cheerful",
+                   "user_level": 7, "streak": "3 days", "task": {"title": "Frost"}}
+        formatter = compile_context_template(template)
+        
+        assert formatter(context) == template.format(**context)
+        # Compiled once per template text
+        assert compile_context_template(template) is formatter
+    
+    def test_compiled_context_template_missing_key(self):
+        """Test that a missing context key still raises KeyError"""
+        from src.config.ai_config import compile_context_template
+        
+        with pytest.raises(KeyError):
+            compile_context_template("Task: {task_title}")({"priority": 1})
+
 
 @pytest.mark.ai_personality
 @pytest.mark.integration
@@ -639,6 +900,70 @@ class TestAIPerformance:
         assert success_count >= 18
         # Should have some combination of AI and fallback responses
         assert (ai_responses + fallback_responses) == success_count
+    
+    def test_identical_generations_share_one_call(self):
+        """Test that concurrent identical AI requests make a single provider call"""
+        from src.services.ai_service import ai_service, AIResponse
+        
+        calls = []
+        
+        async def fake_generate(config, context, context_json=None):
+            calls.append(context)
+            await asyncio.sleep(0.01)
+            return AIResponse(text="🎂 Sweet, shared!", source="ai")
+        
+        async def generate(*keys):
+            return await asyncio.gather(*(
+                ai_service._coalesced_ai_response(key, None, {"key": key}) for key in keys
+            ))
+        
+        with patch.object(ai_service, '_generate_ai_response', new=fake_generate):
+            first, second = asyncio.run(generate(b"same", b"same"))
+            assert len(calls) == 1
+            assert first is second
+            assert not ai_service._inflight
+            
+            # Different keys are generated independently
+            asyncio.run(generate(b"one", b"two"))
+            assert len(calls) == 3
+    
+    @pytest.mark.parametrize("source,cached", [("ai", True), ("cache", True), ("fallback", False), ("static", False)])
+    def test_generic_cake_responses_cached_by_source(self, source, cached):
+        """Test that only AI-generated generic cake responses are reused"""
+        from src.routes import cake
+        
+        def fake_run_async(coro, *args, **kwargs):
+            coro.close()
+            return {"text": "🎂 Keep going!", "mood": "cheerful", "animation": "bounce",
+                    "category": "encouragement", "source": source, "metadata": {}}
+        
+        with patch.dict(cake._response_cache, clear=True), \
+                patch('src.routes.cake.run_async', side_effect=fake_run_async) as mock_run:
+            first = cake.get_cake_response_ai('encouragement', 'cheerful', 1)
+            second = cake.get_cake_response_ai('encouragement', 'cheerful', 1)
+        
+        assert mock_run.call_count == (1 if cached else 2)
+        assert first == second
+        # Callers get their own copy, never the cached dict
+        assert first is not second
+    
+    def test_request_specific_cake_responses_bypass_cache(self):
+        """Test that per-request contexts and no_cache calls always reach the AI"""
+        from src.routes import cake
+        
+        def fake_run_async(coro, *args, **kwargs):
+            coro.close()
+            return {"text": "🎂 Nice!", "mood": "cheerful", "animation": "bounce",
+                    "category": "task_completion", "source": "ai", "metadata": {}}
+        
+        with patch.dict(cake._response_cache, clear=True), \
+                patch('src.routes.cake.run_async', side_effect=fake_run_async) as mock_run:
+            for _ in range(2):
+                cake.get_cake_response_ai('task_completion', 'cheerful', 1, {"task_title": "Bake"})
+                cake.get_cake_response_ai('task_completion', 'cheerful', 1, no_cache=True)
+            assert not cake._response_cache
+        
+        assert mock_run.call_count == 4
 
 
 @pytest.mark.ai_personality
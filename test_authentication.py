@@ -350,6 +350,76 @@ class TestTokenValidation:
         assert 'token' in data['data']
 
 
+@pytest.mark.authentication
+@pytest.mark.high
+class TestTokenVerificationCache:
+    """Test reuse of verified JWT claims across requests"""
+    
+    def test_verified_claims_are_reused(self, flask_app):
+        """Test that a token is only cryptographically verified once while cached"""
+        from src.routes import auth
+        
+        token = auth.generate_token(4242)
+        with patch.dict(auth._token_cache, clear=True), \
+                patch('src.routes.auth.jwt.decode', wraps=auth.jwt.decode) as mock_decode:
+            assert auth.decode_token(token)['user_id'] == 4242
+            assert auth.decode_token(token)['user_id'] == 4242
+        
+        assert mock_decode.call_count == 1
+    
+    def test_invalid_token_is_not_cached(self, flask_app):
+        """Test that failed verifications are never cached"""
+        import jwt
+        from src.routes import auth
+        
+        with patch.dict(auth._token_cache, clear=True):
+            with pytest.raises(jwt.InvalidTokenError):
+                auth.decode_token("not.a.token")
+            assert not auth._token_cache
+    
+    def test_logout_drops_cached_claims(self, client):
+        """Test that logging out forces the token to be verified again"""
+        from src.routes import auth
+        
+        token = auth.generate_token(4243)
+        headers = {"Authorization": f"Bearer {token}"}
+        with patch.dict(auth._token_cache, clear=True):
+            auth.decode_token(token)
+            assert len(auth._token_cache) == 1
+            
+            response = client.post('/api/auth/logout', headers=headers)
+            assert response.status_code == 200
+            assert not auth._token_cache
+            
+            with patch('src.routes.auth.jwt.decode', wraps=auth.jwt.decode) as mock_decode:
+                auth.decode_token(token)
+            assert mock_decode.call_count == 1
+
+    
+    def test_protected_view_receives_user_row(self, flask_app, db_session):
+        """Test that token_required passes the user row and rejects deleted users"""
+        from src.models.user import User
+        from src.routes.auth import generate_token, token_required
+        
+        user = User(username="tokenuser", email="tokenuser@example.com")
+        user.set_password("SecurePass123!")
+        db_session.add(user)
+        db_session.flush()
+        
+        @token_required
+        def view(current_user):
+            return current_user
+        
+        headers = {"Authorization": f"Bearer {generate_token(user.id)}"}
+        with flask_app.test_request_context(headers=headers):
+            assert view() is user
+        
+        db_session.delete(user)
+        db_session.flush()
+        with flask_app.test_request_context(headers=headers):
+            response = view()
+        assert response.status_code == 401
+
 @pytest.mark.authentication
 @pytest.mark.medium
 class TestUserProfile:
@@ -426,6 +496,22 @@ class TestAuthenticationSecurity:
         assert user.password_hash != user_data["password"]
         assert len(user.password_hash) > 50  # Hashed password should be long
     
+    def test_password_hashing_with_configured_method(self, app_modules):
+        """Test that a configured hash method is used and still verifies"""
+        user = app_modules.User(username="hashuser", email="hash@example.com")
+        
+        # No app context is needed when the method is passed explicitly
+        user.set_password("SecurePass123!", method="pbkdf2:sha256:1000")
+        assert user.password_hash.startswith("pbkdf2:sha256:1000$")
+        assert user.check_password("SecurePass123!")
+        assert not user.check_password("WrongPass123!")
+        
+        app = app_modules.app
+        with app.app_context(), patch.dict(app.config, {"PASSWORD_HASH_METHOD": "pbkdf2:sha256:2000"}):
+            user.set_password("SecurePass123!")
+        assert user.password_hash.startswith("pbkdf2:sha256:2000$")
+        assert user.check_password("SecurePass123!")
+    
     def test_sql_injection_protection(self, api_client):
         """Test protection against SQL injection attacks"""
         sql_injection_payloads = [
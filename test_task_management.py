@@ -766,3 +766,71 @@ class TestTaskPerformance:
         # Most operations should succeed
         assert success_count >= 8  # Allow for some failures due to concurrency
 
+
+
+@pytest.mark.task_management
+@pytest.mark.performance
+class TestProjectTaskStats:
+    """Test project task statistics"""
+    
+    @pytest.fixture
+    def project_id(self, db_session):
+        """Create a project with a known mix of tasks, detached from the session"""
+        from src.models.user import User
+        from src.models.project import Project
+        from src.models.task import Task
+        
+        owner = User(username="statsowner", email="statsowner@example.com")
+        owner.set_password("SecurePass123!")
+        db_session.add(owner)
+        db_session.flush()
+        
+        project = Project(name="Cake stats", owner_id=owner.id)
+        db_session.add(project)
+        db_session.flush()
+        
+        past_due = datetime.utcnow() - timedelta(days=1)
+        for status, due_date in [("completed", past_due), ("completed", None), ("in_progress", past_due),
+                                 ("pending", past_due), ("pending", None)]:
+            db_session.add(Task(title=f"{status} task", status=status, due_date=due_date,
+                                user_id=owner.id, project_id=project.id))
+        db_session.flush()
+        db_session.expunge_all()
+        return project.id
+    
+    def test_task_stats_aggregated_without_loading_tasks(self, db_session, project_id):
+        """Test that stats come from SQL when tasks aren't loaded and match the in-memory count"""
+        from sqlalchemy import inspect
+        from src.models.project import Project
+        
+        expected = {"total": 5, "completed": 2, "in_progress": 1, "overdue": 2, "pending": 2}
+        
+        project = db_session.get(Project, project_id)
+        assert project.get_task_stats() == expected
+        assert project.calculate_progress() == 40
+        assert 'tasks' in inspect(project).unloaded
+        
+        # Once the tasks are loaded they are counted in memory, with the same result
+        assert len(project.tasks) == 5
+        assert project.get_task_stats() == expected
+        assert project.calculate_progress() == 40
+    
+    def test_to_dict_stats_and_overdue_are_opt_in(self, db_session, project_id):
+        """Test that Project.to_dict only counts tasks when asked to"""
+        from src.models.project import Project
+        
+        project = db_session.get(Project, project_id)
+        
+        with patch.object(Project, 'get_task_stats') as mock_stats:
+            data = project.to_dict()
+            assert 'task_stats' not in data
+            assert 'is_overdue' not in data
+            
+            # Precomputed stats are used as given, without a query
+            precomputed = {"total": 1, "completed": 1, "in_progress": 0, "overdue": 0, "pending": 0}
+            assert project.to_dict(task_stats=precomputed)['task_stats'] is precomputed
+            mock_stats.assert_not_called()
+        
+        data = project.to_dict(include_stats=True, include_overdue=True)
+        assert data['task_stats']['total'] == 5
+        assert data['is_overdue'] is False
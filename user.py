@@ -1,3 +1,4 @@
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -35,8 +36,15 @@ class User(db.Model):
     achievements = db.relationship('UserAchievement', backref='user', lazy=True, cascade='all, delete-orphan')
     team_memberships = db.relationship('TeamMember', backref='user', lazy=True, cascade='all, delete-orphan')
 
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, method=None):
+        # PASSWORD_HASH_METHOD (e.g. 'pbkdf2:sha256:100000') tunes hashing cost;
+        # check_password reads the method back from the stored hash either way
+        if method is None and has_app_context():
+            method = current_app.config.get('PASSWORD_HASH_METHOD')
+        if method:
+            self.password_hash = generate_password_hash(password, method=method)
+        else:
+            self.password_hash = generate_password_hash(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
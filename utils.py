@@ -0,0 +1,52 @@
+from flask import Response
+from datetime import datetime
+from enum import Enum
+import time
+
+try:
+    import orjson
+    
+    def json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    import json
+    
+    def _json_default(obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        if isinstance(obj, Enum):
+            return obj.value
+        raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+    
+    def json_dumps(obj):
+        return json.dumps(obj, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+# (second, ISO string) of the most recently formatted timestamp
+_iso_timestamp = [(0, '')]
+
+def now_iso():
+    """Current UTC time as an ISO string, formatted at most once per second"""
+    second = int(time.time())
+    cached = _iso_timestamp[0]
+    if cached[0] != second:
+        cached = (second, datetime.utcfromtimestamp(second).isoformat())
+        _iso_timestamp[0] = cached
+    return cached[1]
+
+def json_response(payload, status=200):
+    """Serialize payload into a JSON response"""
+    return Response(json_dumps(payload), status=status, mimetype='application/json')
+
+def success_response(message):
+    """Build a responder for a fixed success envelope around variable data
+    
+    The envelope keys and message are serialized once; each call only
+    serializes ``data`` and splices it in.
+    """
+    prefix = json_dumps({'success': True, 'message': message})[:-1] + b',"data":'
+    suffix = b',"errors":[]}'
+    
+    def respond(data, status=200):
+        body = prefix + json_dumps(data) + suffix
+        return Response(body, status=status, mimetype='application/json')
+    return respond